@@ -0,0 +1,209 @@
+"""
+Ajuste automático dos parâmetros do algoritmo genético por corrida (racing).
+
+Conjuntos de parâmetros candidatos disputam rodadas com o mesmo orçamento de tempo de CPU,
+cada execução em um núcleo. A cada rodada só a melhor fração segue (successive halving) e o
+orçamento é multiplicado, até sobrar um vencedor: o que chega à melhor aptidão com o mesmo
+gasto de CPU. O vencedor é gravado em um arquivo JSON que pode ser lido com
+'algoritmo_genetico.carregar_parametros_ga'.
+"""
+import io
+import json
+import math
+import os
+import random
+import time
+from contextlib import redirect_stdout
+from datetime import datetime
+from multiprocessing import Pool
+from typing import Any, Dict, List, Optional, Tuple
+
+from algoritmo_genetico import algoritmo_genetico
+from solucionadores import custo_dos_grupos
+
+# Faixas sorteadas para cada parâmetro: (escala, mínimo, máximo)
+ESPACO_DE_BUSCA: Dict[str, Tuple[str, float, float]] = {
+    "n_pop": ("log_int", 50, 20000),
+    "taxa_mutacao_inicial": ("log", 0.005, 0.2),
+    "taxa_mutacao_adaptativa": ("log", 0.05, 0.5),
+    "paciencia_adaptacao": ("int", 5, 60),
+    "paciencia_parada": ("int", 20, 200),
+    "elitismo_tamanho": ("int", 1, 10),
+}
+
+# Gerações que o orçamento da primeira rodada precisa comportar; limita o 'n_pop' dos candidatos,
+# já que uma população que mal completa uma geração não chega a ser avaliada como algoritmo genético
+GERACOES_MINIMAS_POR_ORCAMENTO = 10
+
+# Dados do estudo em cada processo da corrida, definidos uma vez por '_inicializar_processo'
+_estudo_do_processo: Dict[str, Any] = {}
+
+
+def _sortear_valor(escala: str, minimo: float, maximo: float, rng: random.Random):
+    if escala == "int":
+        return rng.randint(int(minimo), int(maximo))
+    valor = math.exp(rng.uniform(math.log(minimo), math.log(maximo)))
+    return int(round(valor)) if escala == "log_int" else round(valor, 4)
+
+
+def gerar_candidatos(
+        n_candidatos: int,
+        parametros_atuais: Optional[Dict[str, Any]] = None,
+        semente: Optional[int] = None,
+        n_pop_maximo: Optional[int] = None
+) -> List[Dict[str, Any]]:
+    """
+    Sorteia 'n_candidatos' conjuntos de parâmetros em ESPACO_DE_BUSCA. Se 'parametros_atuais'
+    for informado, ele entra como primeiro candidato, para que a configuração em uso também dispute.
+    Com 'n_pop_maximo', a faixa de 'n_pop' (e o 'n_pop' da configuração em uso) é limitada a ele.
+    """
+    rng = random.Random(semente)
+    espaco = dict(ESPACO_DE_BUSCA)
+    if n_pop_maximo is not None:
+        escala, minimo, maximo = espaco["n_pop"]
+        espaco["n_pop"] = (escala, min(minimo, n_pop_maximo), min(maximo, n_pop_maximo))
+
+    candidatos = []
+    if parametros_atuais:
+        candidatos.append({nome: parametros_atuais[nome] for nome in espaco if nome in parametros_atuais})
+        if n_pop_maximo is not None and candidatos[0].get("n_pop", 0) > n_pop_maximo:
+            print(f"ℹ️  n_pop da configuração em uso limitado de {candidatos[0]['n_pop']} para {n_pop_maximo}.")
+            candidatos[0]["n_pop"] = n_pop_maximo
+    while len(candidatos) < n_candidatos:
+        candidatos.append({nome: _sortear_valor(*faixa, rng) for nome, faixa in espaco.items()})
+    return candidatos
+
+
+def _medir_custo_por_individuo(mapa_caixa_no: Dict[str, Tuple], distancias_precalculadas: Dict[str, Dict[str, float]],
+                               qtd_caixas: int) -> float:
+    """Segundos de CPU para criar, avaliar e reproduzir um indivíduo em uma geração, medidos em uma execução curta."""
+    n_pop, n_ger = 256, 4
+    inicio_cpu = time.process_time()
+    with redirect_stdout(io.StringIO()):
+        algoritmo_genetico(mapa_caixa_no, distancias_precalculadas, qtd_caixas, n_pop=n_pop, n_ger=n_ger,
+                           processos=1, semente=0)
+    return (time.process_time() - inicio_cpu) / (n_pop * n_ger)
+
+
+def _inicializar_processo(mapa_caixa_no: Dict[str, Tuple], distancias_precalculadas: Dict[str, Dict[str, float]],
+                          qtd_caixas: int):
+    _estudo_do_processo.update(mapa_caixa_no=mapa_caixa_no, distancias_precalculadas=distancias_precalculadas,
+                               qtd_caixas=qtd_caixas)
+
+
+def _correr_candidato(tarefa: Tuple[int, Dict[str, Any], int, float]) -> Tuple[int, float, float]:
+    """Executa um candidato com o orçamento de CPU da rodada e retorna (indice, aptidao, cpu_gasta)."""
+    indice, parametros, semente, orcamento_cpu = tarefa
+    inicio_cpu = time.process_time()
+    # A saída de dezenas de execuções simultâneas só atrapalharia a leitura do resumo das rodadas
+    with redirect_stdout(io.StringIO()):
+        grupos = algoritmo_genetico(
+            mapa_caixa_no=_estudo_do_processo["mapa_caixa_no"],
+            distancias_precalculadas=_estudo_do_processo["distancias_precalculadas"],
+            qtd_caixas=_estudo_do_processo["qtd_caixas"],
+            n_ger=10 ** 9,
+            processos=1,
+            orcamento_cpu=orcamento_cpu,
+            semente=semente,
+            **parametros
+        )
+    # Sem grupos, o orçamento acabou antes da primeira geração ser avaliada
+    aptidao = custo_dos_grupos(grupos, _estudo_do_processo["distancias_precalculadas"]) if grupos else float('inf')
+    return indice, aptidao, time.process_time() - inicio_cpu
+
+
+def ajustar_parametros_ga(
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        n_candidatos: int = 16,
+        orcamento_inicial_cpu: float = 5.0,
+        fator_eliminacao: int = 2,
+        n_repeticoes: int = 1,
+        parametros_atuais: Optional[Dict[str, Any]] = None,
+        processos: Optional[int] = None,
+        semente: Optional[int] = None,
+        arquivo_saida: Optional[str] = "parametros_ga.json"
+) -> Dict[str, Any]:
+    """
+    Escolhe os parâmetros do algoritmo genético por successive halving.
+
+    Args:
+        n_candidatos: Quantos conjuntos de parâmetros disputam a primeira rodada.
+        orcamento_inicial_cpu: Segundos de CPU de cada execução na primeira rodada.
+        fator_eliminacao: A cada rodada fica 1/fator dos candidatos e o orçamento é multiplicado por ele.
+        n_repeticoes: Execuções (com sementes diferentes) por candidato e rodada; a aptidão é a média.
+        parametros_atuais: Configuração em uso, incluída como candidata (ex.: a de main.py).
+        processos: Execuções simultâneas; o padrão é uma por núcleo.
+        arquivo_saida: Onde gravar o vencedor (JSON). None para não gravar.
+
+    Returns:
+        Os parâmetros vencedores. 'n_ger' não é ajustado: a parada fica a cargo de 'paciencia_parada'.
+    """
+    print("\n--- Iniciando Ajuste de Parâmetros por Corrida ---")
+    custo_por_individuo = _medir_custo_por_individuo(mapa_caixa_no, distancias_precalculadas, qtd_caixas)
+    n_pop_maximo = max(int(ESPACO_DE_BUSCA["n_pop"][1]),
+                       int(orcamento_inicial_cpu / (custo_por_individuo * GERACOES_MINIMAS_POR_ORCAMENTO)))
+    print(f"Custo por indivíduo e geração: {custo_por_individuo * 1000:.2f}ms de CPU | n_pop limitado a {n_pop_maximo}")
+    candidatos = gerar_candidatos(n_candidatos, parametros_atuais, semente, n_pop_maximo)
+    semente_base = semente if semente is not None else random.randrange(2 ** 31)
+    sobreviventes = list(range(len(candidatos)))
+    orcamento_cpu = orcamento_inicial_cpu
+    resultado_por_candidato: Dict[int, Tuple[float, float]] = {}
+    cpu_total = 0.0
+    rodada = 0
+
+    with Pool(processos, initializer=_inicializar_processo,
+              initargs=(mapa_caixa_no, distancias_precalculadas, qtd_caixas)) as pool:
+        while True:
+            rodada += 1
+            # Todos os candidatos da rodada usam as mesmas sementes, para uma comparação justa
+            tarefas = [(indice, candidatos[indice], semente_base + rodada * 1000 + repeticao, orcamento_cpu)
+                       for indice in sobreviventes for repeticao in range(n_repeticoes)]
+            print(f"Rodada {rodada}: {len(sobreviventes)} candidatos com {orcamento_cpu:.1f}s de CPU cada...")
+
+            somas: Dict[int, List[float]] = {indice: [0.0, 0.0] for indice in sobreviventes}
+            for indice, aptidao, cpu_gasta in pool.map(_correr_candidato, tarefas):
+                somas[indice][0] += aptidao
+                somas[indice][1] += cpu_gasta
+                cpu_total += cpu_gasta
+            resultado_por_candidato = {indice: (aptidao / n_repeticoes, cpu / n_repeticoes)
+                                       for indice, (aptidao, cpu) in somas.items()}
+
+            # Melhor aptidão com o mesmo orçamento; em empate, quem parou antes gastou menos CPU
+            sobreviventes.sort(key=lambda indice: resultado_por_candidato[indice])
+            for posicao, indice in enumerate(sobreviventes[:5]):
+                aptidao, cpu = resultado_por_candidato[indice]
+                print(f"  {posicao + 1}º candidato {indice}: {aptidao:.2f}m em {cpu:.1f}s de CPU | {candidatos[indice]}")
+
+            if len(sobreviventes) <= 1:
+                break
+            sobreviventes = sobreviventes[:max(1, len(sobreviventes) // fator_eliminacao)]
+            if len(sobreviventes) == 1:
+                break
+            orcamento_cpu *= fator_eliminacao
+
+    vencedor = sobreviventes[0]
+    aptidao_vencedor, cpu_vencedor = resultado_por_candidato[vencedor]
+    parametros_vencedores = dict(candidatos[vencedor])
+    print(f"🏆 Vencedor após {rodada} rodadas ({cpu_total:.0f}s de CPU no total): {parametros_vencedores}")
+
+    if arquivo_saida:
+        configuracao = {
+            "parametros": parametros_vencedores,
+            "ajuste": {
+                "aptidao": aptidao_vencedor,
+                "cpu_segundos": cpu_vencedor,
+                "orcamento_cpu_final": orcamento_cpu,
+                "rodadas": rodada,
+                "n_candidatos": len(candidatos),
+                "qtd_caixas": qtd_caixas,
+                "qtd_caixas_no_estudo": len(mapa_caixa_no),
+                "data": datetime.now().isoformat(timespec="seconds"),
+            },
+        }
+        with open(arquivo_saida, "w", encoding="utf-8") as f:
+            json.dump(configuracao, f, ensure_ascii=False, indent=2)
+        print(f"Parâmetros gravados em: {os.path.abspath(arquivo_saida)}")
+
+    return parametros_vencedores
@@ -1,6 +1,9 @@
+import heapq
+import json
 import random
-from typing import List, Dict, Any, Tuple
-import networkx as nx
+import time
+from contextlib import nullcontext
+from typing import List, Dict, Any, Tuple, Callable, Optional
 from functools import partial
 from multiprocessing import Pool
 import pickle  # NOVIDADE: Importa a biblioteca para salvar/carregar estado
@@ -14,6 +17,48 @@ def _criar_individuo(lista_de_caixas: List[str]) -> List[str]:
     return individuo
 
 
+def _criar_individuo_guloso(lista_de_caixas: List[str], distancias: Dict[str, Dict[str, float]],
+                            qtd_caixas: int) -> List[str]:
+    """Percorre as caixas em ordem aleatória; cada caixa ainda livre vira hub das suas vizinhas livres mais próximas."""
+    ordem = _criar_individuo(lista_de_caixas)
+    livres = set(lista_de_caixas)
+    individuo = []
+    for hub_nome in ordem:
+        if hub_nome not in livres:
+            continue
+        livres.discard(hub_nome)
+        distancias_do_hub = distancias.get(hub_nome, {})
+        membros = heapq.nsmallest(qtd_caixas - 1, livres, key=lambda nome: distancias_do_hub.get(nome, 1e9))
+        livres.difference_update(membros)
+        individuo.append(hub_nome)
+        individuo.extend(membros)
+    return individuo
+
+
+def _perturbar_individuo(individuo: List[str], n_trocas: int) -> List[str]:
+    """Cópia do indivíduo com 'n_trocas' trocas aleatórias de posição (caixas mudam de grupo ou de papel)."""
+    perturbado = list(individuo)
+    for _ in range(n_trocas):
+        idx1, idx2 = random.sample(range(len(perturbado)), 2)
+        perturbado[idx1], perturbado[idx2] = perturbado[idx2], perturbado[idx1]
+    return perturbado
+
+
+def _chave_canonica(individuo: List[str], qtd_caixas: int) -> frozenset:
+    """Identifica o agrupamento do indivíduo independentemente da ordem dos grupos e dos membros."""
+    return frozenset((individuo[i], frozenset(individuo[i + 1:i + qtd_caixas]))
+                     for i in range(0, len(individuo), qtd_caixas))
+
+
+def _medir_diversidade(populacao: List[List[str]], qtd_caixas: int, tamanho_amostra: int) -> float:
+    """
+    Fração de conjuntos de hubs distintos em uma amostra da população (1.0 = todos diferentes).
+    Os hubs bastam para separar os quase-clones da elite e custam uma fração da chave canônica completa.
+    """
+    amostra = populacao if len(populacao) <= tamanho_amostra else random.sample(populacao, tamanho_amostra)
+    return len({frozenset(individuo[::qtd_caixas]) for individuo in amostra}) / len(amostra)
+
+
 def _calcular_aptidao(individuo: List[str], distancias: Dict[str, Dict[str, float]], qtd_caixas: int) -> float:
     distancia_total = 0.0
     for i in range(0, len(individuo), qtd_caixas):
@@ -34,6 +79,24 @@ def _calcular_aptidao_wrapper(individuo: List[str], distancias: Dict[str, Dict[s
     return _calcular_aptidao(individuo, distancias, qtd_caixas)
 
 
+# Com 'orcamento_cpu', a população é criada, avaliada e reproduzida em lotes deste tamanho, com o
+# orçamento conferido entre um lote e outro, para que uma população grande não o estoure dentro de uma geração
+_TAMANHO_LOTE_ORCAMENTO = 256
+
+# Avaliador de comprimento real de cabo de cada processo do Pool, definido uma única vez por
+# '_inicializar_avaliador_cabo' para não ser serializado a cada lote de indivíduos
+_avaliador_cabo_do_processo = None
+
+
+def _inicializar_avaliador_cabo(avaliador_cabo) -> None:
+    global _avaliador_cabo_do_processo
+    _avaliador_cabo_do_processo = avaliador_cabo
+
+
+def _calcular_aptidao_cabo(individuo: List[str], qtd_caixas: int) -> float:
+    return _avaliador_cabo_do_processo.comprimento_do_individuo(individuo, qtd_caixas)
+
+
 def _selecao_torneio(populacao: List[List[str]], aptidoes: List[float], k: int = 3) -> List[str]:
     indices_torneio = random.sample(range(len(populacao)), k)
     melhor_indice_no_torneio = min(indices_torneio, key=lambda i: aptidoes[i])
@@ -75,9 +138,61 @@ def algoritmo_genetico(
         paciencia_parada: int = 50,
         elitismo_tamanho: int = 2,
         ## NOVIDADE: Parâmetro com o caminho do arquivo de estado
-        arquivo_estado: str = None
+        arquivo_estado: str = None,
+        avaliador_cabo=None,
+        cabo_como_aptidao: bool = False,
+        n_reclassificacao: int = 50,
+        ao_progredir: Optional[Callable[[int, float], None]] = None,
+        processos: Optional[int] = None,
+        orcamento_cpu: Optional[float] = None,
+        semente: Optional[int] = None,
+        limite_inferior: Optional[float] = None,
+        gap_alvo: Optional[float] = None,
+        populacao_adaptativa: bool = False,
+        n_pop_minimo: int = 1000,
+        diversidade_minima: float = 0.1,
+        fracao_reinjecao: float = 0.5,
+        amostra_diversidade: int = 200
 ) -> List[Dict[str, Any]]:
+    """
+    Agrupa as caixas em blocos de 'qtd_caixas' (o primeiro de cada bloco é o hub).
+
+    Com um 'avaliador_cabo' (avaliacao_cabo.AvaliadorComprimentoCabo), o comprimento real de cabo
+    (união das rotas, com troncos compartilhados contados uma vez) é usado de duas formas:
+    se 'cabo_como_aptidao' for True, ele passa a ser a aptidão de toda a população; caso
+    contrário, os 'n_reclassificacao' melhores indivíduos da última geração são reclassificados
+    por ele ao final e o melhor em comprimento real é retornado.
+
+    Se informado, 'ao_progredir(geracao, melhor_aptidao)' é chamado ao fim de cada geração.
+
+    'processos' limita o Pool de avaliação; com 1, a população é avaliada no próprio processo,
+    sem Pool. 'orcamento_cpu' encerra a execução após esse tempo de CPU (em segundos) do processo
+    chamador, o que só reflete o custo total quando 'processos' é 1. O orçamento é conferido a cada
+    lote de indivíduos, inclusive no meio de uma geração; nesse caso, vale o melhor já avaliado.
+
+    Com 'gap_alvo' (ex.: 0.01 para 1%), o limite de 'limite_inferior.limite_inferior_agrupamento'
+    é calculado no início, o log mostra o gap (melhor aptidão - limite inferior) / melhor aptidão e a
+    execução termina assim que ele fica abaixo de 'gap_alvo'. Um 'limite_inferior' já conhecido
+    dispensa o cálculo e também liga o gap no log, mesmo sem 'gap_alvo'.
+    O limite vale para a distância em estrela, então não é usado quando 'cabo_como_aptidao' é True.
+
+    Com 'populacao_adaptativa', a diversidade (fração de conjuntos de hubs distintos em uma amostra de
+    até 'amostra_diversidade' indivíduos) é medida quando o tamanho pode mudar. Abaixo de 'diversidade_minima',
+    a população é reduzida à metade, até 'n_pop_minimo', pois os quase-clones da elite só custam
+    avaliações; acima do dobro dela, volta a dobrar, até 'n_pop'. O tamanho muda no máximo uma vez
+    a cada 'paciencia_adaptacao' gerações. A cada 'paciencia_adaptacao' gerações sem melhora, junto
+    com a mutação adaptativa, 'fracao_reinjecao' da nova população é trocada por indivíduos novos:
+    até 100 gulosos e o restante cópias perturbadas dos melhores, que (ao contrário de indivíduos
+    aleatórios) ainda vencem torneios.
+    """
     print("\n--- Iniciando Algoritmo Genético Avançado ---")
+    if semente is not None:
+        random.seed(semente)
+    inicio_cpu = time.process_time()
+
+    def _orcamento_esgotado() -> bool:
+        return orcamento_cpu is not None and time.process_time() - inicio_cpu >= orcamento_cpu
+
     lista_de_nomes_caixas = list(mapa_caixa_no.keys())
 
     ## NOVIDADE: Lógica para carregar o estado anterior
@@ -110,55 +225,163 @@ def algoritmo_genetico(
     # Se a população não foi carregada, cria uma nova
     if not populacao:
         print("Nenhum progresso encontrado ou falha no carregamento. Iniciando do zero.")
-        populacao = [_criar_individuo(lista_de_nomes_caixas) for _ in range(n_pop)]
+        for i in range(n_pop):
+            if i % _TAMANHO_LOTE_ORCAMENTO == 0 and _orcamento_esgotado():
+                break
+            populacao.append(_criar_individuo(lista_de_nomes_caixas))
+
+    # Tamanho da população das próximas gerações; no modo adaptativo, um estado salvo mantém o tamanho em que parou
+    tamanho_populacao = n_pop
+    if populacao_adaptativa:
+        n_pop_minimo = min(n_pop, max(n_pop_minimo, elitismo_tamanho + 3))
+        tamanho_populacao = max(n_pop_minimo, min(n_pop, len(populacao)))
+    geracao_ultimo_ajuste = ger_inicial - paciencia_adaptacao
+    total_avaliacoes = 0
 
     if ger_inicial >= n_ger:
         print("O treinamento salvo já completou ou excedeu o número de gerações alvo.")
 
     calculador_de_aptidao_parcial = partial(_calcular_aptidao_wrapper, distancias=distancias_precalculadas,
                                             qtd_caixas=qtd_caixas)
-
-    with Pool() as pool:
+    argumentos_pool = {}
+    if avaliador_cabo is not None and cabo_como_aptidao:
+        print("Usando o comprimento real de cabo como aptidão. Preparando árvores de caminhos mínimos...")
+        avaliador_cabo.preparar(lista_de_nomes_caixas)
+        calculador_de_aptidao_parcial = partial(_calcular_aptidao_cabo, qtd_caixas=qtd_caixas)
+        argumentos_pool = {"initializer": _inicializar_avaliador_cabo, "initargs": (avaliador_cabo,)}
+    if cabo_como_aptidao and avaliador_cabo is not None:
+        if limite_inferior is not None or gap_alvo is not None:
+            print("⚠️ Aviso: O limite inferior vale para a distância em estrela, não para o cabo real. Gap desativado.")
+        limite_inferior, gap_alvo = None, None
+    elif limite_inferior is None and gap_alvo is not None:
+        from limite_inferior import limite_inferior_agrupamento
+
+        limite_inferior = limite_inferior_agrupamento(distancias_precalculadas, qtd_caixas, lista_de_nomes_caixas)
+        print(f"Limite inferior da distância total: {limite_inferior:.2f}m")
+
+    def _texto_gap() -> str:
+        if limite_inferior is None or melhor_aptidao_global <= 0:
+            return ""
+        return f" | Gap: {_calcular_gap(melhor_aptidao_global, limite_inferior) * 100:.2f}%"
+
+    reclassificar_elite = avaliador_cabo is not None and not cabo_como_aptidao and n_reclassificacao > 0
+    # Última população avaliada e suas aptidões, de onde saem os candidatos da reclassificação
+    populacao_avaliada: List[List[str]] = []
+    aptidoes_avaliadas: List[float] = []
+
+    if processos == 1:
+        # Sem Pool: o avaliador de cabo (se houver) é definido direto neste processo
+        if argumentos_pool:
+            _inicializar_avaliador_cabo(avaliador_cabo)
+        contexto_pool = nullcontext()
+    else:
+        contexto_pool = Pool(processos, **argumentos_pool)
+
+    with contexto_pool as pool:
+        mapear = pool.map if pool is not None else (lambda funcao, itens: list(map(funcao, itens)))
         # O loop agora começa da 'ger_inicial'
         for ger in range(ger_inicial, n_ger):
+            if _orcamento_esgotado():
+                print(f"\n⏹️ Orçamento de CPU de {orcamento_cpu:.1f}s esgotado na geração {ger + 1}.")
+                break
+
             # (A lógica de avaliação, elitismo, adaptação e parada continua a mesma)
-            aptidoes = pool.map(calculador_de_aptidao_parcial, populacao)
+            if orcamento_cpu is None:
+                aptidoes = mapear(calculador_de_aptidao_parcial, populacao)
+            else:
+                aptidoes = []
+                for inicio in range(0, len(populacao), _TAMANHO_LOTE_ORCAMENTO):
+                    if _orcamento_esgotado():
+                        break
+                    aptidoes.extend(mapear(calculador_de_aptidao_parcial, populacao[inicio:inicio + _TAMANHO_LOTE_ORCAMENTO]))
+                # Se o orçamento acabou no meio da avaliação, a geração considera só os indivíduos avaliados
+                populacao = populacao[:len(aptidoes)]
+                if not aptidoes:
+                    continue
+            total_avaliacoes += len(aptidoes)
 
             melhor_aptidao_da_geracao = min(aptidoes)
+            populacao_avaliada, aptidoes_avaliadas = populacao, aptidoes
 
             if melhor_aptidao_da_geracao < melhor_aptidao_global:
                 melhor_aptidao_global = melhor_aptidao_da_geracao
                 melhor_individuo_global = populacao[aptidoes.index(melhor_aptidao_da_geracao)]
                 geracoes_sem_melhora = 0
                 taxa_mutacao_atual = taxa_mutacao_inicial
-                print(f"Geração {ger + 1}/{n_ger} | 🏆 Nova Melhor Aptidão: {melhor_aptidao_global:.2f}m")
+                print(f"Geração {ger + 1}/{n_ger} | 🏆 Nova Melhor Aptidão: {melhor_aptidao_global:.2f}m{_texto_gap()}")
             else:
                 geracoes_sem_melhora += 1
                 if (ger + 1) % 10 == 0:
                     print(
-                        f"Geração {ger + 1}/{n_ger} | Aptidão Estagnada: {melhor_aptidao_global:.2f}m (sem melhora há {geracoes_sem_melhora} gerações)")
+                        f"Geração {ger + 1}/{n_ger} | Aptidão Estagnada: {melhor_aptidao_global:.2f}m (sem melhora há {geracoes_sem_melhora} gerações){_texto_gap()}")
+
+            if ao_progredir is not None:
+                ao_progredir(ger + 1, melhor_aptidao_global)
+
+            if gap_alvo is not None and _calcular_gap(melhor_aptidao_global, limite_inferior) <= gap_alvo:
+                print(
+                    f"\n⏹️ Parada por gap na geração {ger + 1}. A solução está a no máximo {gap_alvo * 100:.2f}% do ótimo.")
+                break
 
             if geracoes_sem_melhora >= paciencia_parada:
                 print(
                     f"\n⏹️ Parada Antecipada na geração {ger + 1}. A solução não melhora há {paciencia_parada} gerações.")
                 break
 
+            # Sem orçamento para reproduzir, a próxima iteração apenas encerra a execução
+            if _orcamento_esgotado():
+                continue
+
             if geracoes_sem_melhora == paciencia_adaptacao:
                 taxa_mutacao_atual = taxa_mutacao_adaptativa
                 print(
                     f"⚠️  Estagnação detectada! Aumentando a taxa de mutação para {taxa_mutacao_atual * 100:.0f}% por um tempo.")
 
+            reinjetar = False
+            if populacao_adaptativa:
+                # Só mede quando o tamanho pode mudar: fora da janela ou já no limite, a medida seria descartada
+                pode_reduzir = tamanho_populacao > n_pop_minimo
+                pode_aumentar = tamanho_populacao < n_pop
+                if ger - geracao_ultimo_ajuste >= paciencia_adaptacao and (pode_reduzir or pode_aumentar):
+                    diversidade = _medir_diversidade(populacao, qtd_caixas, amostra_diversidade)
+                    if diversidade < diversidade_minima and pode_reduzir:
+                        tamanho_populacao = max(n_pop_minimo, tamanho_populacao // 2)
+                        geracao_ultimo_ajuste = ger
+                        print(f"📉 Diversidade em {diversidade * 100:.0f}%. Reduzindo a população para {tamanho_populacao} indivíduos.")
+                    elif diversidade >= 2 * diversidade_minima and pode_aumentar:
+                        tamanho_populacao = min(n_pop, tamanho_populacao * 2)
+                        geracao_ultimo_ajuste = ger
+                        print(f"📈 Diversidade em {diversidade * 100:.0f}%. Aumentando a população para {tamanho_populacao} indivíduos.")
+                reinjetar = geracoes_sem_melhora > 0 and geracoes_sem_melhora % paciencia_adaptacao == 0
+
             nova_populacao = []
             populacao_ordenada = [x for _, x in sorted(zip(aptidoes, populacao), key=lambda pair: pair[0])]
             elite = populacao_ordenada[:elitismo_tamanho]
             nova_populacao.extend(elite)
 
-            for _ in range(elitismo_tamanho, n_pop):
+            n_novos = int((tamanho_populacao - elitismo_tamanho) * fracao_reinjecao) if reinjetar else 0
+            for _ in range(elitismo_tamanho, tamanho_populacao - n_novos):
                 pai1 = _selecao_torneio(populacao, aptidoes)
                 pai2 = _selecao_torneio(populacao, aptidoes)
                 filho = _cruzamento(pai1, pai2, qtd_caixas)
                 filho_mutado = _mutacao(filho, taxa_mutacao_atual)
                 nova_populacao.append(filho_mutado)
+                if len(nova_populacao) % _TAMANHO_LOTE_ORCAMENTO == 0 and _orcamento_esgotado():
+                    break
+            if _orcamento_esgotado():
+                continue
+
+            if n_novos:
+                # Os gulosos custam O(n²/qtd_caixas) cada, por isso são no máximo 100; os demais saem dos 10% melhores
+                n_gulosos = min(n_novos // 2, 100)
+                nova_populacao.extend(_criar_individuo_guloso(lista_de_nomes_caixas, distancias_precalculadas, qtd_caixas)
+                                      for _ in range(n_gulosos))
+                melhores = populacao_ordenada[:max(elitismo_tamanho, len(populacao_ordenada) // 10)]
+                max_trocas = max(2, len(lista_de_nomes_caixas) // 10)
+                nova_populacao.extend(_perturbar_individuo(random.choice(melhores), random.randint(2, max_trocas))
+                                      for _ in range(n_novos - n_gulosos))
+                print(f"🌱 Reinjetando {n_novos} indivíduos novos ({n_gulosos} gulosos, {n_novos - n_gulosos} perturbações "
+                      f"dos melhores) na população de {tamanho_populacao}.")
 
             populacao = nova_populacao
 
@@ -176,8 +399,14 @@ def algoritmo_genetico(
                     pickle.dump(estado_atual, f)
                 # print(f"💾 Progresso salvo na geração {ger + 1}.") # descomente se quiser uma mensagem a cada salvamento
 
+    if reclassificar_elite and melhor_individuo_global:
+        melhor_individuo_global = _reclassificar_por_cabo(
+            [melhor_individuo_global] + _candidatos_distintos(populacao_avaliada, aptidoes_avaliadas, qtd_caixas,
+                                                              n_reclassificacao),
+            avaliador_cabo, qtd_caixas)
+
     # (A lógica de decodificação do resultado final permanece a mesma)
-    print("--- Algoritmo Genético Finalizado ---")
+    print(f"--- Algoritmo Genético Finalizado ({total_avaliacoes} avaliações) ---")
     grupos_finais = []
     if melhor_individuo_global:
         for i in range(0, len(melhor_individuo_global), qtd_caixas):
@@ -188,4 +417,60 @@ def algoritmo_genetico(
                     "grupo": nomes_grupo
                 })
 
-    return grupos_finais
\ No newline at end of file
+    return grupos_finais
+
+
+def _calcular_gap(melhor_aptidao: float, limite_inferior: float) -> float:
+    """Fração da melhor aptidão que ainda pode, no máximo, ser ganha: (melhor - limite) / melhor."""
+    if melhor_aptidao == float('inf'):
+        return float('inf')
+    if melhor_aptidao <= 0:
+        return 0.0
+    return max(0.0, (melhor_aptidao - limite_inferior) / melhor_aptidao)
+
+
+def _candidatos_distintos(populacao: List[List[str]], aptidoes: List[float], qtd_caixas: int,
+                          n_candidatos: int) -> List[List[str]]:
+    """
+    Os até 'n_candidatos' melhores agrupamentos distintos da população. Com a população convergida,
+    os melhores indivíduos são quase todos cópias; a busca se limita aos 10 * n_candidatos melhores.
+    """
+    candidatos = []
+    chaves_vistas = set()
+    for i in heapq.nsmallest(10 * n_candidatos, range(len(populacao)), key=aptidoes.__getitem__):
+        chave = _chave_canonica(populacao[i], qtd_caixas)
+        if chave not in chaves_vistas:
+            chaves_vistas.add(chave)
+            candidatos.append(populacao[i])
+            if len(candidatos) >= n_candidatos:
+                break
+    return candidatos
+
+
+def _reclassificar_por_cabo(candidatos: List[List[str]], avaliador_cabo, qtd_caixas: int) -> List[str]:
+    """Retorna, entre os candidatos (o primeiro é o melhor pela aptidão em estrela), o de menor cabo real."""
+    vistos = set()
+    melhor_candidato, melhor_comprimento = candidatos[0], None
+    comprimento_do_primeiro = None
+    for candidato in candidatos:
+        chave = tuple(candidato)
+        if chave in vistos:
+            continue
+        vistos.add(chave)
+        comprimento = avaliador_cabo.comprimento_do_individuo(candidato, qtd_caixas)
+        if comprimento_do_primeiro is None:
+            comprimento_do_primeiro = comprimento
+        if melhor_comprimento is None or comprimento < melhor_comprimento:
+            melhor_candidato, melhor_comprimento = candidato, comprimento
+    print(f"Reclassificação por cabo real ({len(vistos)} candidatos): {comprimento_do_primeiro:.2f}m → {melhor_comprimento:.2f}m")
+    return melhor_candidato
+
+
+def carregar_parametros_ga(caminho_arquivo: str) -> Dict[str, Any]:
+    """
+    Lê um arquivo de parâmetros gerado por 'ajuste_parametros.ajustar_parametros_ga' e retorna os
+    argumentos para 'algoritmo_genetico' (ex.: algoritmo_genetico(..., n_ger=n_ger, **parametros)).
+    """
+    with open(caminho_arquivo, 'r', encoding='utf-8') as f:
+        configuracao = json.load(f)
+    return dict(configuracao["parametros"])
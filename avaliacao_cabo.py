@@ -0,0 +1,121 @@
+"""
+Avaliação do comprimento real de cabo de um grupo.
+
+A aptidão do algoritmo genético soma as distâncias hub→membro (uma estrela), mas o roteamento
+lança o cabo como a união dos caminhos mais curtos a partir do hub, em que trechos de tronco
+compartilhados contam uma única vez. Este módulo calcula essa união a partir de árvores de
+predecessores dos caminhos mais curtos, guardadas uma por caixa.
+"""
+from __future__ import annotations
+
+from typing import Dict, Iterable, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import numpy as np
+
+
+class AvaliadorComprimentoCabo:
+    """
+    Calcula o comprimento da união das rotas hub→membros de um grupo.
+
+    Para cada caixa usada como hub é calculada (uma vez, sob demanda) a árvore de caminhos
+    mais curtos da rede, guardada como arrays de predecessores e distâncias indexados pelo
+    número do nó. O comprimento de um grupo é obtido subindo de cada membro pela árvore até
+    encontrar um nó já visitado, somando apenas os trechos novos. Os resultados por grupo
+    ficam em cache, pois os mesmos grupos aparecem repetidamente na população.
+    """
+
+    def __init__(
+            self,
+            rede_grafo: nx.Graph,
+            mapa_nomes_para_coordenadas: Dict[str, Tuple[float, float]],
+            tamanho_maximo_cache: int = 200000
+    ):
+        self.rede_grafo = rede_grafo
+        self.nos = list(rede_grafo.nodes())
+        self.indice_do_no = {no: i for i, no in enumerate(self.nos)}
+        self.indice_da_caixa = {nome: self.indice_do_no[no] for nome, no in mapa_nomes_para_coordenadas.items()
+                                if no in self.indice_do_no}
+        self.tamanho_maximo_cache = tamanho_maximo_cache
+        self._arvores: Dict[int, Tuple[np.ndarray, np.ndarray]] = {}
+        self._cache_grupos: Dict[Tuple[str, frozenset], float] = {}
+
+    def _arvore(self, indice_origem: int) -> Tuple[np.ndarray, np.ndarray]:
+        """Retorna (predecessores, distancias) da árvore de caminhos mais curtos a partir do nó."""
+        arvore = self._arvores.get(indice_origem)
+        if arvore is None:
+            import networkx as nx
+            import numpy as np
+
+            predecessores_por_no, distancias_por_no = nx.dijkstra_predecessor_and_distance(
+                self.rede_grafo, self.nos[indice_origem], weight='weight'
+            )
+            predecessores = np.full(len(self.nos), -1, dtype=np.int32)
+            distancias = np.full(len(self.nos), np.inf, dtype=np.float64)
+            for no, distancia in distancias_por_no.items():
+                i = self.indice_do_no[no]
+                distancias[i] = distancia
+                lista_predecessores = predecessores_por_no.get(no)
+                if lista_predecessores:
+                    predecessores[i] = self.indice_do_no[lista_predecessores[0]]
+            arvore = (predecessores, distancias)
+            self._arvores[indice_origem] = arvore
+        return arvore
+
+    def preparar(self, nomes_das_caixas: Optional[Iterable[str]] = None):
+        """
+        Calcula de antemão as árvores das caixas informadas (todas, por padrão). Útil antes de
+        abrir um Pool, para que os processos filhos herdem as árvores em vez de recalculá-las.
+        """
+        for nome in (nomes_das_caixas if nomes_das_caixas is not None else self.indice_da_caixa):
+            if nome in self.indice_da_caixa:
+                self._arvore(self.indice_da_caixa[nome])
+
+    def comprimento_do_grupo(self, hub_nome: str, membros: Iterable[str], penalidade: float = 1e9) -> float:
+        """
+        Comprimento (em metros) da união das rotas do hub até cada membro do grupo.
+        Membros sem caminho até o hub somam 'penalidade', como na aptidão do algoritmo genético.
+        """
+        chave = (hub_nome, frozenset(membros))
+        comprimento = self._cache_grupos.get(chave)
+        if comprimento is not None:
+            return comprimento
+
+        indice_hub = self.indice_da_caixa.get(hub_nome)
+        if indice_hub is None:
+            comprimento = penalidade * len(chave[1])
+        else:
+            predecessores, distancias = self._arvore(indice_hub)
+            visitados = {indice_hub}
+            comprimento = 0.0
+            for nome_caixa in chave[1]:
+                indice = self.indice_da_caixa.get(nome_caixa)
+                if indice is None or distancias[indice] == float('inf'):
+                    if nome_caixa != hub_nome:
+                        comprimento += penalidade
+                    continue
+                # Sobe pela árvore até encontrar um trecho já contado
+                while indice not in visitados:
+                    visitados.add(indice)
+                    anterior = int(predecessores[indice])
+                    comprimento += float(distancias[indice] - distancias[anterior])
+                    indice = anterior
+
+        if len(self._cache_grupos) >= self.tamanho_maximo_cache:
+            self._cache_grupos.clear()
+        self._cache_grupos[chave] = comprimento
+        return comprimento
+
+    def comprimento_do_individuo(self, individuo: List[str], qtd_caixas: int) -> float:
+        """Soma o comprimento real de cabo de cada bloco de 'qtd_caixas' do indivíduo (hub = primeiro)."""
+        comprimento_total = 0.0
+        for i in range(0, len(individuo), qtd_caixas):
+            grupo_nomes = individuo[i:i + qtd_caixas]
+            if grupo_nomes:
+                comprimento_total += self.comprimento_do_grupo(grupo_nomes[0], grupo_nomes)
+        return comprimento_total
+
+    def comprimento_dos_grupos(self, grupos: List[Dict]) -> float:
+        """Soma o comprimento real de cabo de uma solução no formato [{'hub', 'grupo'}]."""
+        return sum(self.comprimento_do_grupo(grupo["hub"], grupo["grupo"]) for grupo in grupos)
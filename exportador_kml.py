@@ -1,9 +1,11 @@
-from typing import List, Tuple, Dict
-from pyproj import Transformer
-import simplekml
-import networkx as nx
-from shapely.geometry import LineString, MultiLineString
-from shapely.ops import linemerge
+from __future__ import annotations
+
+from typing import List, Tuple, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import networkx as nx
+    import simplekml
+    from pyproj import Transformer
 
 
 def desenhar_grupo_no_mapa_kml(
@@ -23,6 +25,10 @@ def desenhar_grupo_no_mapa_kml(
     Esta função pega uma solução de rede calculada e a representa visualmente,
     criando pastas, pontos e linhas com estilos apropriados no KML.
     """
+    import simplekml
+    import networkx as nx
+    from shapely.geometry import LineString, MultiLineString
+    from shapely.ops import linemerge
 
     # Se nenhum documento KML existente for fornecido, cria um novo.
     if documento_kml_existente is None:
@@ -126,66 +132,36 @@ def desenhar_grupo_no_mapa_kml(
             print(f"Erro ao salvar o arquivo KML em '{arquivo_de_saida_kml}': {e}")
 
 
-## OTIMIZAÇÃO: Nova função para diagnosticar componentes desconectados
-def exportar_componentes_desconectados_kml(
-        rede_grafo: nx.Graph,
+def desenhar_pontes_sinteticas_kml(
+        pontes: List[Tuple],
         conversor_de_coordenadas_para_mapa: Transformer,
-        caminho_arquivo_saida: str
+        documento_kml_existente: simplekml.Kml,
+        nome_da_pasta_no_mapa: str = "Pontes Sintéticas (reparo de conectividade)"
 ):
     """
-    Gera um arquivo KML para visualizar os componentes desconectados de um grafo.
-    Cada componente (ilha) será desenhado com uma cor diferente.
+    Desenha as pontes criadas pelo reparo de conectividade, para que fique claro no mapa
+    quais trechos não existem no KML de origem e precisam ser conferidos em campo.
 
     Args:
-        rede_grafo: O grafo da rede (potencialmente desconectado).
-        conversor_de_coordenadas_para_mapa: O transformer do pyproj para converter de volta para Lat/Lon.
-        caminho_arquivo_saida: O nome do arquivo KML de diagnóstico a ser salvo.
+        pontes: Lista de (no_a, no_b, distancia) retornada por 'reparar_conectividade_da_rede'.
     """
-    print(f"Exportando KML de diagnóstico para '{caminho_arquivo_saida}'...")
-
-    # Encontra todos os componentes (ilhas) do grafo
-    componentes = list(nx.connected_components(rede_grafo))
-    componentes.sort(key=len, reverse=True)  # Ordena do maior para o menor
-
-    kml = simplekml.Kml()
-
-    # Define uma lista de cores para diferenciar os componentes
-    cores = [
-        simplekml.Color.red, simplekml.Color.blue, simplekml.Color.green,
-        simplekml.Color.yellow, simplekml.Color.purple, simplekml.Color.orange,
-        simplekml.Color.cyan, simplekml.Color.magenta, simplekml.Color.white,
-        simplekml.Color.lightblue, simplekml.Color.lightgreen, simplekml.Color.brown,
-        simplekml.Color.darkorange, simplekml.Color.darkgreen, simplekml.Color.pink
-    ]
-
-    # Itera sobre cada componente encontrado
-    for i, componente_nodes in enumerate(componentes):
-        # Cria um subgrafo contendo apenas os nós e arestas deste componente
-        subgrafo = rede_grafo.subgraph(componente_nodes)
-
-        # Cria uma pasta no KML para este componente
-        pasta = kml.newfolder(name=f"Componente {i + 1} ({subgrafo.number_of_nodes()} nós)")
-
-        # Seleciona uma cor para este componente
-        cor_atual = cores[i % len(cores)]  # Usa o módulo para repetir as cores se houver mais componentes
+    import simplekml
 
-        # Itera sobre cada aresta (linha) do componente
-        for u, v in subgrafo.edges():
-            try:
-                # Converte as coordenadas dos pontos da aresta de volta para Lat/Lon
-                ponto_u_geo = conversor_de_coordenadas_para_mapa.transform(*u)
-                ponto_v_geo = conversor_de_coordenadas_para_mapa.transform(*v)
-
-                # Desenha a linha no KML
-                linestring = pasta.newlinestring(name=f"Aresta {i}")
-                linestring.coords = [ponto_u_geo, ponto_v_geo]
-                linestring.style.linestyle.color = cor_atual
-                linestring.style.linestyle.width = 4  # Largura maior para melhor visualização
-            except Exception as e:
-                print(f"Aviso: Erro ao processar uma aresta no componente {i + 1}: {e}")
+    if not pontes:
+        return
 
-    kml.save(caminho_arquivo_saida)
-    print(f"✅ KML de diagnóstico salvo. Abra-o no Google Earth para ver as 'ilhas' da rede.")
+    pasta_pontes = documento_kml_existente.newfolder(name=nome_da_pasta_no_mapa)
+    for ponto_inicio, ponto_fim, distancia in pontes:
+        try:
+            lonlat_inicio = conversor_de_coordenadas_para_mapa.transform(*ponto_inicio)
+            lonlat_fim = conversor_de_coordenadas_para_mapa.transform(*ponto_fim)
+            linha_kml = pasta_pontes.newlinestring(name=f"Ponte sintética ({distancia:.1f}m)")
+            linha_kml.coords = [lonlat_inicio, lonlat_fim]
+            linha_kml.description = "Trecho criado automaticamente para ligar uma ilha da rede. Não existe no KML de origem."
+            linha_kml.style.linestyle.color = simplekml.Color.magenta
+            linha_kml.style.linestyle.width = 5
+        except Exception as e:
+            print(f"Erro ao transformar coordenadas da ponte sintética ({ponto_inicio}, {ponto_fim}): {e}")
 
 
 ## OTIMIZAÇÃO: Nova função para diagnosticar componentes desconectados
@@ -203,6 +179,9 @@ def exportar_componentes_desconectados_kml(
         conversor_de_coordenadas_para_mapa: O transformer do pyproj para converter de volta para Lat/Lon.
         caminho_arquivo_saida: O nome do arquivo KML de diagnóstico a ser salvo.
     """
+    import simplekml
+    import networkx as nx
+
     print(f"Exportando KML de diagnóstico para '{caminho_arquivo_saida}'...")
 
     # Encontra todos os componentes (ilhas) do grafo
@@ -232,7 +211,7 @@ def exportar_componentes_desconectados_kml(
         cor_atual = cores[i % len(cores)]  # Usa o módulo para repetir as cores se houver mais componentes
 
         # Itera sobre cada aresta (linha) do componente
-        for u, v in subgrafo.edges():
+        for u, v, dados_aresta in subgrafo.edges(data=True):
             try:
                 # Converte as coordenadas dos pontos da aresta de volta para Lat/Lon
                 ponto_u_geo = conversor_de_coordenadas_para_mapa.transform(*u)
@@ -243,6 +222,13 @@ def exportar_componentes_desconectados_kml(
                 linestring.coords = [ponto_u_geo, ponto_v_geo]
                 linestring.style.linestyle.color = cor_atual
                 linestring.style.linestyle.width = 4  # Largura maior para melhor visualização
+
+                # Pontes do reparo de conectividade usam o mesmo estilo de 'desenhar_pontes_sinteticas_kml'
+                if dados_aresta.get("sintetica"):
+                    linestring.name = f"Ponte sintética ({dados_aresta.get('weight', 0.0):.1f}m)"
+                    linestring.description = "Trecho criado automaticamente para ligar uma ilha da rede. Não existe no KML de origem."
+                    linestring.style.linestyle.color = simplekml.Color.magenta
+                    linestring.style.linestyle.width = 5
             except Exception as e:
                 print(f"Aviso: Erro ao processar uma aresta no componente {i + 1}: {e}")
 
@@ -1,8 +1,11 @@
-from typing import List, Tuple, Dict
-from shapely.geometry import LineString, Point
-from shapely.ops import transform as shapely_transform
-import networkx as nx
-from pyproj import Transformer
+from __future__ import annotations
+
+from typing import Iterable, List, Tuple, Dict, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import networkx as nx
+    from pyproj import Transformer
+    from shapely.geometry import LineString, Point
 
 
 def construir_rede_em_grafo(
@@ -19,6 +22,10 @@ def construir_rede_em_grafo(
     Returns:
         Uma tupla contendo o grafo NetworkX e uma lista de todos os segmentos de linha.
     """
+    import networkx as nx
+    from shapely.geometry import LineString
+    from shapely.ops import transform as shapely_transform
+
     rede_grafo = nx.Graph()
     segmentos_da_rede: List[Dict] = []
 
@@ -61,6 +68,9 @@ def inserir_caixas_na_rede_do_grafo(
     Insere as caixas no grafo, projetando-as no segmento de linha mais próximo,
     desde que a distância seja menor que o 'raio_maximo_busca'.
     """
+    from shapely.geometry import LineString
+    from shapely.ops import transform as shapely_transform
+
     mapa_nomes_para_coordenadas: Dict[str, Tuple[float, float]] = {}
     epsilon = 1e-6  # Uma tolerância mínima para comparar pontos flutuantes
 
@@ -134,4 +144,278 @@ def inserir_caixas_na_rede_do_grafo(
             if distancia_entre_nos < tolerancia_conexao_proxima and not rede_grafo.has_edge(todos_nos[i], todos_nos[j]):
                 rede_grafo.add_edge(todos_nos[i], todos_nos[j], weight=distancia_entre_nos)
 
-    return mapa_nomes_para_coordenadas
\ No newline at end of file
+    return mapa_nomes_para_coordenadas
+
+def calcular_distancias_entre_caixas(
+        rede_grafo: nx.Graph,
+        mapa_nomes_para_coordenadas: Dict[str, Tuple[float, float]]
+) -> Dict[str, Dict[str, float]]:
+    """
+    Calcula a distância pela rede entre todos os pares de caixas.
+
+    Returns:
+        Um dicionário no formato {nome_caixa_origem: {nome_caixa_destino: distancia}}.
+    """
+    import networkx as nx
+
+    # Várias caixas podem cair sobre o mesmo nó, por isso o mapa inverso guarda listas de nomes
+    nomes_por_no: Dict[Tuple[float, float], List[str]] = {}
+    for nome_caixa, no_caixa in mapa_nomes_para_coordenadas.items():
+        nomes_por_no.setdefault(no_caixa, []).append(nome_caixa)
+
+    distancias_precalculadas: Dict[str, Dict[str, float]] = {}
+    for no_origem, nomes_origem in nomes_por_no.items():
+        comprimentos = nx.single_source_dijkstra_path_length(rede_grafo, source=no_origem, weight='weight')
+        linha_de_distancias = {
+            nome_destino: comprimentos[no_destino]
+            for no_destino, nomes_destino in nomes_por_no.items() if no_destino in comprimentos
+            for nome_destino in nomes_destino
+        }
+        for nome_origem in nomes_origem:
+            distancias_precalculadas[nome_origem] = dict(linha_de_distancias)
+
+    return distancias_precalculadas
+
+
+def rotear_grupos_sem_sobreposicao(
+        rede_grafo: nx.Graph,
+        grupos_calculados: List[Dict],
+        mapa_nomes_para_coordenadas: Dict[str, Tuple[float, float]]
+) -> List[Dict]:
+    """
+    Traça os cabos de cada grupo pelo caminho mais curto até o hub, removendo as arestas
+    já usadas de uma cópia do grafo para que dois grupos nunca compartilhem o mesmo trecho.
+
+    Returns:
+        Uma lista de dicionários com 'nome_hub', 'grupo_final', 'conexoes_principais'
+        e 'conexoes_secundarias', no formato esperado por 'desenhar_grupo_no_mapa_kml'.
+    """
+    import networkx as nx
+
+    grupos_finais_para_kml: List[Dict] = []
+    grafo_para_roteamento = rede_grafo.copy()
+
+    for i, grupo in enumerate(grupos_calculados):
+        hub_nome = grupo.get("hub")
+        membros_grupo = grupo.get("grupo", [])
+        conexoes_principais_grupo = set()
+
+        if not hub_nome or not membros_grupo:
+            print(f"  - AVISO: Grupo {i + 1} inválido (sem hub ou membros). Ignorando.")
+            continue
+
+        try:
+            hub_node = mapa_nomes_para_coordenadas[hub_nome]
+
+            for nome_caixa in membros_grupo:
+                if nome_caixa == hub_nome:
+                    continue
+                caixa_node = mapa_nomes_para_coordenadas[nome_caixa]
+                caminho = nx.shortest_path(grafo_para_roteamento, source=hub_node, target=caixa_node,
+                                           weight='weight')
+                for j in range(len(caminho) - 1):
+                    u, v = caminho[j], caminho[j + 1]
+                    conexoes_principais_grupo.add(tuple(sorted((u, v))))
+
+            # Arestas contraídas voltam a ser os segmentos originais antes de ir para o KML
+            segmentos_do_cabo = set()
+            for u, v in conexoes_principais_grupo:
+                if grafo_para_roteamento.has_edge(u, v):
+                    segmentos_do_cabo.update(tuple(sorted(segmento))
+                                             for segmento in expandir_aresta(grafo_para_roteamento, u, v))
+                    grafo_para_roteamento.remove_edge(u, v)
+            conexoes_principais_grupo = segmentos_do_cabo
+
+            print(
+                f"  - Grupo {i + 1} (Hub: {hub_nome}): {len(membros_grupo)} caixas. Rota com {len(conexoes_principais_grupo)} segmentos de cabo."
+            )
+
+        except (nx.NetworkXNoPath, KeyError) as e:
+            print(
+                f"  - ERRO: Grupo {i + 1} (Hub: {hub_nome}) não pôde ser roteado. Causa: {e}. O grupo será desenhado sem cabos."
+            )
+            conexoes_principais_grupo = set()
+
+        grupos_finais_para_kml.append({
+            "nome_hub": hub_nome,
+            "grupo_final": membros_grupo,
+            "conexoes_principais": list(conexoes_principais_grupo),
+            "conexoes_secundarias": []
+        })
+
+    return grupos_finais_para_kml
+
+
+class _UniaoBusca:
+    """Estrutura union-find (conjuntos disjuntos) sobre índices inteiros."""
+
+    def __init__(self, quantidade: int):
+        self.pai = list(range(quantidade))
+        self.tamanho = [1] * quantidade
+
+    def encontrar(self, i: int) -> int:
+        while self.pai[i] != i:
+            self.pai[i] = self.pai[self.pai[i]]
+            i = self.pai[i]
+        return i
+
+    def unir(self, a: int, b: int) -> bool:
+        """Une os conjuntos de 'a' e 'b'. Retorna False se já eram o mesmo conjunto."""
+        raiz_a, raiz_b = self.encontrar(a), self.encontrar(b)
+        if raiz_a == raiz_b:
+            return False
+        if self.tamanho[raiz_a] < self.tamanho[raiz_b]:
+            raiz_a, raiz_b = raiz_b, raiz_a
+        self.pai[raiz_b] = raiz_a
+        self.tamanho[raiz_a] += self.tamanho[raiz_b]
+        return True
+
+
+def reparar_conectividade_da_rede(
+        rede_grafo: nx.Graph,
+        distancia_maxima_ponte: float
+) -> List[Tuple[Tuple[float, float], Tuple[float, float], float]]:
+    """
+    Liga as ilhas (componentes desconectados) do grafo com as menores pontes possíveis.
+
+    As pontas de linha (nós de grau 0 ou 1) de cada componente são consultadas em um índice
+    espacial sobre todos os nós, buscando nós de outros componentes a até 'distancia_maxima_ponte'
+    metros. As pontes candidatas são então percorridas da mais curta para a mais longa e, como no
+    algoritmo de Kruskal, só são adicionadas as que unem dois componentes ainda separados
+    (controlados por union-find). Assim cada ilha é ligada ao componente principal, direta ou
+    indiretamente, pelo menor vão disponível, sem as arestas espúrias de aumentar
+    'tolerancia_conexao_proxima' para a rede toda.
+
+    As pontes são adicionadas ao grafo com o atributo 'sintetica=True'.
+
+    Returns:
+        A lista de pontes adicionadas, no formato (no_a, no_b, distancia).
+    """
+    import numpy as np
+    import shapely
+
+    nos = list(rede_grafo.nodes())
+    if len(nos) < 2:
+        return []
+    indice_do_no = {no: i for i, no in enumerate(nos)}
+
+    uniao = _UniaoBusca(len(nos))
+    for u, v in rede_grafo.edges():
+        uniao.unir(indice_do_no[u], indice_do_no[v])
+    componente = np.array([uniao.encontrar(i) for i in range(len(nos))])
+    if len(np.unique(componente)) == 1:
+        return []
+
+    # Consultas a partir das pontas de linha; componentes sem pontas (ex.: anéis) entram com todos os nós
+    graus = np.array([rede_grafo.degree(no) for no in nos])
+    eh_ponta = graus <= 1
+    componentes_com_ponta = np.unique(componente[eh_ponta])
+    eh_consulta = eh_ponta | ~np.isin(componente, componentes_com_ponta)
+    indices_consulta = np.flatnonzero(eh_consulta)
+
+    coordenadas = np.array(nos, dtype=np.float64)
+    arvore = shapely.STRtree(shapely.points(coordenadas))
+    posicoes_consulta, indices_alvo = arvore.query(
+        shapely.points(coordenadas[indices_consulta]), predicate="dwithin", distance=distancia_maxima_ponte
+    )
+    indices_origem = indices_consulta[posicoes_consulta]
+
+    de_outro_componente = componente[indices_origem] != componente[indices_alvo]
+    indices_origem = indices_origem[de_outro_componente]
+    indices_alvo = indices_alvo[de_outro_componente]
+    distancias = np.hypot(*(coordenadas[indices_origem] - coordenadas[indices_alvo]).T)
+
+    pontes = []
+    for k in np.argsort(distancias, kind="stable"):
+        a, b = int(indices_origem[k]), int(indices_alvo[k])
+        if uniao.unir(a, b):
+            distancia = float(distancias[k])
+            rede_grafo.add_edge(nos[a], nos[b], weight=distancia, sintetica=True)
+            pontes.append((nos[a], nos[b], distancia))
+
+    return pontes
+
+
+def contrair_cadeias_de_grau_2(
+        rede_grafo: nx.Graph,
+        nos_protegidos: Iterable[Tuple[float, float]]
+) -> int:
+    """
+    Substitui cada cadeia de nós de grau 2 (curvas de uma mesma linha) por uma única aresta
+    com o peso somado, reduzindo o grafo que os algoritmos de caminho mínimo percorrem.
+
+    Os nós em 'nos_protegidos' (as caixas) nunca são removidos. A aresta criada guarda em
+    'vertices' a sequência original de nós, de uma ponta à outra, para que o roteamento e o
+    KML continuem com a geometria exata (ver 'expandir_aresta'). Cadeias cuja contração
+    criaria um laço ou uma aresta paralela a outra já existente são mantidas como estão.
+
+    Returns:
+        A quantidade de nós removidos.
+    """
+    protegidos = set(nos_protegidos)
+
+    def eh_interno(no) -> bool:
+        return rede_grafo.degree(no) == 2 and no not in protegidos
+
+    # As cadeias são identificadas antes de qualquer alteração, partindo dos nós que ficam
+    cadeias = []
+    visitados = set()
+    for no_inicio in rede_grafo.nodes():
+        if eh_interno(no_inicio):
+            continue
+        for vizinho in rede_grafo.neighbors(no_inicio):
+            if not eh_interno(vizinho) or vizinho in visitados:
+                continue
+            cadeia = [no_inicio, vizinho]
+            visitados.add(vizinho)
+            while eh_interno(cadeia[-1]):
+                proximo = next(no for no in rede_grafo.neighbors(cadeia[-1]) if no != cadeia[-2])
+                if eh_interno(proximo):
+                    visitados.add(proximo)
+                cadeia.append(proximo)
+            cadeias.append(cadeia)
+
+    nos_removidos = 0
+    for cadeia in cadeias:
+        no_a, no_b = cadeia[0], cadeia[-1]
+        if no_a == no_b or rede_grafo.has_edge(no_a, no_b):
+            continue
+
+        vertices = []
+        peso_total = 0.0
+        sintetica = False
+        for u, v in zip(cadeia, cadeia[1:]):
+            dados = rede_grafo[u][v]
+            peso_total += dados['weight']
+            sintetica = sintetica or dados.get('sintetica', False)
+            # Uma aresta já contraída (de uma chamada anterior) contribui com seus próprios vértices
+            trecho = _vertices_da_aresta(dados, u, v)
+            vertices.extend(trecho if not vertices else trecho[1:])
+
+        rede_grafo.remove_nodes_from(cadeia[1:-1])
+        nos_removidos += len(cadeia) - 2
+        atributos = {'weight': peso_total, 'vertices': vertices}
+        if sintetica:
+            atributos['sintetica'] = True
+        rede_grafo.add_edge(no_a, no_b, **atributos)
+
+    return nos_removidos
+
+
+def _vertices_da_aresta(dados: Dict, u: Tuple[float, float], v: Tuple[float, float]) -> List[Tuple[float, float]]:
+    """Sequência de nós originais da aresta, orientada de 'u' para 'v'."""
+    vertices = dados.get('vertices')
+    if not vertices:
+        return [u, v]
+    return list(vertices) if vertices[0] == u else list(reversed(vertices))
+
+
+def expandir_aresta(rede_grafo: nx.Graph, u: Tuple[float, float], v: Tuple[float, float]) -> List[Tuple]:
+    """
+    Converte uma aresta do grafo (possivelmente contraída) nos segmentos originais que ela representa.
+
+    Returns:
+        Lista de pares (ponto_a, ponto_b), um por segmento da linha original.
+    """
+    vertices = _vertices_da_aresta(rede_grafo[u][v], u, v)
+    return list(zip(vertices, vertices[1:]))
@@ -1,7 +1,14 @@
+from __future__ import annotations
+
 import os
+import warnings
 import xml.etree.ElementTree as ET
-from typing import List, Tuple, Dict
-from shapely.geometry import LineString, Point
+from itertools import compress
+from typing import List, Tuple, Dict, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+    from shapely.geometry import LineString, Point
 
 def carregar_kml_raiz(caminho_do_arquivo: str) -> ET.Element:
     """
@@ -36,6 +43,123 @@ def extrair_pontos_do_texto_de_coordenadas(texto_das_coordenadas: str) -> List[T
             print(f"Aviso: Coordenada com formato inválido '{texto_do_ponto}' será ignorada: {e}")
     return pontos
 
+def _extrair_array_tolerante(texto_das_coordenadas: str) -> np.ndarray:
+    import numpy as np
+
+    pontos = extrair_pontos_do_texto_de_coordenadas(texto_das_coordenadas)
+    return np.array(pontos, dtype=np.float64).reshape(len(pontos), 2)
+
+def _decodificar_blocos(textos: List[str]) -> Optional[Tuple[np.ndarray, np.ndarray, np.ndarray, np.ndarray]]:
+    """
+    Converte os blocos unidos em um único texto com uma só chamada do NumPy (np.fromstring).
+
+    Retorna (valores, componentes_por_tupla, limites_de_tuplas, componentes_do_bloco), ou None se
+    algum bloco tiver texto não ASCII ou valor não numérico. 'componentes_do_bloco' é 2 ou 3 quando
+    todas as tuplas do bloco têm a mesma quantidade de componentes e 0 quando não (ou o bloco é vazio);
+    a validação conta vírgulas e espaços sobre os bytes, também de forma vetorizada.
+    """
+    import numpy as np
+
+    texto_unido = " ".join(textos)
+    try:
+        dados = np.frombuffer(texto_unido.encode("ascii"), dtype=np.uint8)
+    except UnicodeEncodeError:
+        return None
+
+    # Uma tupla começa em cada byte que não é espaço (nem caractere de controle) e vem depois de um espaço
+    espaco = dados <= 32
+    inicio_de_tupla = ~espaco
+    inicio_de_tupla[1:] &= espaco[:-1]
+    inicios_das_tuplas = np.flatnonzero(inicio_de_tupla)
+    # Vírgulas de cada tupla: as que ficam entre o início dela e o da seguinte
+    virgulas_antes = np.searchsorted(np.flatnonzero(dados == 44), np.append(inicios_das_tuplas, len(dados)))
+    componentes_por_tupla = np.diff(virgulas_antes) + 1
+
+    # Faixa de tuplas de cada bloco, a partir da posição em que cada bloco termina no texto unido
+    tamanhos = np.fromiter((len(texto) for texto in textos), dtype=np.int64, count=len(textos))
+    fins_dos_blocos = np.cumsum(tamanhos + 1) - 1
+    limites_de_tuplas = np.concatenate(([0], np.searchsorted(inicios_das_tuplas, fins_dos_blocos)))
+
+    with warnings.catch_warnings():
+        # Com um valor não numérico, o NumPy para a leitura no meio e só avisa
+        warnings.simplefilter("error")
+        try:
+            valores = np.fromstring(texto_unido.replace(",", " "), dtype=np.float64, sep=" ")
+        except (ValueError, DeprecationWarning):
+            return None
+    if len(valores) != componentes_por_tupla.sum():
+        return None
+
+    qtd_por_bloco = np.diff(limites_de_tuplas)
+    nao_vazios = qtd_por_bloco > 0
+    componentes_do_bloco = np.zeros(len(textos), dtype=np.int64)
+    if len(inicios_das_tuplas):
+        minimo = np.minimum.reduceat(componentes_por_tupla, limites_de_tuplas[:-1][nao_vazios])
+        maximo = np.maximum.reduceat(componentes_por_tupla, limites_de_tuplas[:-1][nao_vazios])
+        componentes_do_bloco[nao_vazios] = np.where((minimo == maximo) & ((minimo == 2) | (minimo == 3)), minimo, 0)
+    return valores, componentes_por_tupla, limites_de_tuplas, componentes_do_bloco
+
+def extrair_arrays_dos_textos_de_coordenadas(textos_das_coordenadas: List[str]) -> List[np.ndarray]:
+    """
+    Converte vários blocos <coordinates> de uma vez para arrays NumPy de forma (N, 2) ou (N, 3).
+
+    Os valores de todos os blocos são convertidos juntos (ver '_decodificar_blocos'). Blocos
+    malformados recorrem ao parser tolerante 'extrair_pontos_do_texto_de_coordenadas', que ignora
+    apenas os pontos inválidos, e viram arrays (N, 2).
+    """
+    import numpy as np
+
+    textos = [texto or "" for texto in textos_das_coordenadas]
+    decodificados = _decodificar_blocos(textos) if textos else None
+    if decodificados is None:
+        # Algum bloco não converteu: converte bloco a bloco, para que só ele vá ao parser tolerante
+        if len(textos) <= 1:
+            return [_extrair_array_tolerante(texto) for texto in textos]
+        return [extrair_arrays_dos_textos_de_coordenadas([texto])[0] for texto in textos]
+    valores, componentes_por_tupla, limites_de_tuplas, componentes_do_bloco = decodificados
+    limites_de_valores = np.concatenate(([0], np.cumsum(componentes_por_tupla)))[limites_de_tuplas]
+
+    # Daqui em diante, listas do Python: indexar escalares do NumPy um a um custaria mais que a conversão
+    arrays: List[np.ndarray] = []
+    for texto, qtd_pontos, componentes, inicio, fim in zip(textos, np.diff(limites_de_tuplas).tolist(), componentes_do_bloco.tolist(),
+                                                            limites_de_valores[:-1].tolist(), limites_de_valores[1:].tolist()):
+        if qtd_pontos == 0:
+            arrays.append(np.empty((0, 2), dtype=np.float64))
+        elif componentes:
+            arrays.append(valores[inicio:fim].reshape(qtd_pontos, componentes))
+        else:
+            arrays.append(_extrair_array_tolerante(texto))
+    return arrays
+
+def _extrair_xy_dos_textos_de_coordenadas(textos_das_coordenadas: List[str]) -> Tuple[np.ndarray, np.ndarray]:
+    """
+    Como 'extrair_arrays_dos_textos_de_coordenadas', mas devolve só (x, y) de todos os pontos em um
+    único array (T, 2) e a quantidade de pontos de cada bloco, sem montar um array por bloco.
+    """
+    import numpy as np
+
+    textos = [texto or "" for texto in textos_das_coordenadas]
+    decodificados = _decodificar_blocos(textos) if textos else None
+    if decodificados is not None:
+        valores, componentes_por_tupla, limites_de_tuplas, componentes_do_bloco = decodificados
+        qtd_por_bloco = np.diff(limites_de_tuplas)
+        if np.all((componentes_do_bloco > 0) | (qtd_por_bloco == 0)):
+            inicio_de_cada_tupla = np.cumsum(componentes_por_tupla) - componentes_por_tupla
+            return valores[inicio_de_cada_tupla[:, None] + np.arange(2)], qtd_por_bloco
+
+    arrays = extrair_arrays_dos_textos_de_coordenadas(textos)
+    qtd_por_bloco = np.fromiter((len(coordenadas) for coordenadas in arrays), dtype=np.int64, count=len(arrays))
+    if not qtd_por_bloco.sum():
+        return np.empty((0, 2), dtype=np.float64), qtd_por_bloco
+    return np.concatenate([coordenadas[:, :2] for coordenadas in arrays]), qtd_por_bloco
+
+def extrair_array_do_texto_de_coordenadas(texto_das_coordenadas: str) -> np.ndarray:
+    """
+    Converte um único bloco <coordinates> para um array NumPy de forma (N, 2) ou (N, 3).
+    Ver 'extrair_arrays_dos_textos_de_coordenadas', mais rápido para muitos blocos.
+    """
+    return extrair_arrays_dos_textos_de_coordenadas([texto_das_coordenadas])[0]
+
 def extrair_geometrias_do_kml(
     raiz_kml: ET.Element,
     namespace_kml: Dict[str, str]
@@ -46,9 +170,15 @@ def extrair_geometrias_do_kml(
     A função percorre recursivamente os elementos KML, buscando por Placemarks
     em pastas com nomes específicos ('linhas_eletricas', 'caixas').
     """
-    linhas_geograficas: List[LineString] = []
-    nomes_das_linhas: List[str] = []
-    caixas_com_nome: List[Tuple[Point, str]] = []
+    # Importados aqui para que carregar este módulo não exija o shapely
+    import numpy as np
+    import shapely
+
+    # Os textos das coordenadas são acumulados e convertidos todos de uma vez no final, assim como as geometrias
+    textos_das_linhas: List[str] = []
+    nomes_das_linhas_lidas: List[str] = []
+    textos_das_caixas: List[str] = []
+    nomes_das_caixas_lidas: List[str] = []
 
     def percorrer_elementos_kml(elemento_xml: ET.Element, caminho_da_pasta_atual: List[str]):
         """
@@ -70,10 +200,8 @@ def extrair_geometrias_do_kml(
                 if elemento_linestring is not None:
                     elemento_coordenadas = elemento_linestring.find('kml:coordinates', namespace_kml)
                     if elemento_coordenadas is not None and elemento_coordenadas.text:
-                        coordenadas = extrair_pontos_do_texto_de_coordenadas(elemento_coordenadas.text)
-                        if len(coordenadas) >= 2:
-                            linhas_geograficas.append(LineString(coordenadas))
-                            nomes_das_linhas.append(nome_do_placemark)
+                        textos_das_linhas.append(elemento_coordenadas.text)
+                        nomes_das_linhas_lidas.append(nome_do_placemark)
                 return # Já processamos este placemark, não precisa olhar os filhos
 
             # Procura por pontos na pasta 'caixas'
@@ -82,10 +210,8 @@ def extrair_geometrias_do_kml(
                 if elemento_point is not None:
                     elemento_coordenadas = elemento_point.find('kml:coordinates', namespace_kml)
                     if elemento_coordenadas is not None and elemento_coordenadas.text:
-                        coordenadas = extrair_pontos_do_texto_de_coordenadas(elemento_coordenadas.text)
-                        if coordenadas: # Se a lista não estiver vazia
-                            ponto = Point(coordenadas[0])
-                            caixas_com_nome.append((ponto, nome_do_placemark))
+                        textos_das_caixas.append(elemento_coordenadas.text)
+                        nomes_das_caixas_lidas.append(nome_do_placemark)
                 return # Já processamos este placemark
 
         # Se não for um Placemark de interesse, continua a busca nos elementos filhos
@@ -93,4 +219,26 @@ def extrair_geometrias_do_kml(
             percorrer_elementos_kml(elemento_filho, novo_caminho_da_pasta)
 
     percorrer_elementos_kml(raiz_kml, [])
+
+    # Linhas e caixas convertidas juntas, em uma única chamada ao NumPy
+    qtd_linhas = len(textos_das_linhas)
+    xy, qtd_por_bloco = _extrair_xy_dos_textos_de_coordenadas(textos_das_linhas + textos_das_caixas)
+    inicios_dos_blocos = np.cumsum(qtd_por_bloco) - qtd_por_bloco
+
+    # Construtores vetorizados do shapely: uma única chamada para todas as linhas e outra para as caixas
+    qtd_pontos_das_linhas = qtd_por_bloco[:qtd_linhas]
+    linhas_validas = qtd_pontos_das_linhas >= 2
+    nomes_das_linhas = list(compress(nomes_das_linhas_lidas, linhas_validas.tolist()))
+    linhas_geograficas: List[LineString] = []
+    if nomes_das_linhas:
+        pontos_das_linhas = xy[:qtd_pontos_das_linhas.sum()]
+        indices = np.repeat(np.arange(len(nomes_das_linhas)), qtd_pontos_das_linhas[linhas_validas])
+        linhas_geograficas = list(shapely.linestrings(pontos_das_linhas[np.repeat(linhas_validas, qtd_pontos_das_linhas)], indices=indices))
+
+    caixas_validas = qtd_por_bloco[qtd_linhas:] >= 1 # Só o primeiro ponto de cada caixa
+    caixas_com_nome: List[Tuple[Point, str]] = []
+    if caixas_validas.any():
+        pontos = shapely.points(xy[inicios_dos_blocos[qtd_linhas:][caixas_validas]])
+        caixas_com_nome = list(zip(pontos, compress(nomes_das_caixas_lidas, caixas_validas.tolist())))
+
     return linhas_geograficas, nomes_das_linhas, caixas_com_nome
\ No newline at end of file
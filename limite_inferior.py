@@ -0,0 +1,141 @@
+"""
+Limite inferior para a distância total hub→membro do agrupamento das caixas.
+
+O agrupamento é um problema de p-medianas capacitado: ceil(n / qtd_caixas) grupos, cada hub
+atendendo no máximo qtd_caixas caixas (ele incluído). Nenhuma solução pode custar menos que o
+limite calculado aqui, então a diferença relativa (gap) entre a melhor solução encontrada e o
+limite diz o quanto, no máximo, ainda se pode ganhar continuando a otimização.
+"""
+from __future__ import annotations
+
+import math
+from typing import Dict, List, Optional, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import numpy as np
+
+# Mesma penalidade usada pelo algoritmo genético para pares de caixas sem caminho na rede
+DISTANCIA_SEM_CAMINHO = 1e9
+
+
+def _matriz_de_distancias(distancias: Dict[str, Dict[str, float]], nomes: List[str]) -> np.ndarray:
+    """Matriz densa com d[j, i] = distância do hub j até a caixa i."""
+    import numpy as np
+
+    matriz = np.full((len(nomes), len(nomes)), DISTANCIA_SEM_CAMINHO, dtype=np.float64)
+    indice = {nome: i for i, nome in enumerate(nomes)}
+    for nome_origem, linha in distancias.items():
+        j = indice.get(nome_origem)
+        if j is None:
+            continue
+        for nome_destino, distancia in linha.items():
+            i = indice.get(nome_destino)
+            if i is not None:
+                matriz[j, i] = distancia
+    np.fill_diagonal(matriz, 0.0)
+    return matriz
+
+
+def _limite_vizinho_mais_proximo(matriz: np.ndarray, n_grupos: int) -> float:
+    """
+    Exatamente n - n_grupos caixas não são hubs e cada uma custa ao menos a distância até a
+    caixa mais próxima; logo a soma das n - n_grupos menores dessas distâncias é um limite.
+    """
+    import numpy as np
+
+    n = matriz.shape[0]
+    sem_diagonal = matriz + np.diag(np.full(n, np.inf))
+    mais_proximo = sem_diagonal.min(axis=0)
+    return float(np.sort(mais_proximo)[:n - n_grupos].sum())
+
+
+def _custo_guloso(matriz: np.ndarray, qtd_caixas: int) -> float:
+    """Solução viável simples (cada caixa livre agrupa suas vizinhas livres mais próximas), usada como limite superior."""
+    import numpy as np
+
+    n = matriz.shape[0]
+    ordem_por_hub = np.argsort(matriz, axis=1)
+    livre = np.ones(n, dtype=bool)
+    custo = 0.0
+    for hub in range(n):
+        if not livre[hub]:
+            continue
+        livre[hub] = False
+        membros = [i for i in ordem_por_hub[hub] if livre[i]][:qtd_caixas - 1]
+        livre[membros] = False
+        custo += float(matriz[hub, membros].sum())
+    return custo
+
+
+def limite_inferior_agrupamento(
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        nomes_das_caixas: Optional[List[str]] = None,
+        n_iter: int = 200,
+        limite_superior: Optional[float] = None
+) -> float:
+    """
+    Calcula um limite inferior para a soma das distâncias hub→membro.
+
+    Usa o maior entre o limite do vizinho mais próximo e o de uma relaxação lagrangiana das
+    restrições de atribuição ("cada caixa em exatamente um grupo"), otimizada por subgradiente.
+    Relaxadas essas restrições, cada hub candidato escolhe sozinho até 'qtd_caixas' caixas de
+    custo reduzido negativo e basta escolher os n_grupos hubs de menor valor.
+
+    Args:
+        nomes_das_caixas: Caixas consideradas (padrão: as chaves de 'distancias_precalculadas').
+        n_iter: Iterações do subgradiente.
+        limite_superior: Custo de uma solução conhecida, usado no passo do subgradiente.
+            Se omitido, usa o de uma solução gulosa.
+    """
+    import numpy as np
+
+    nomes = list(nomes_das_caixas) if nomes_das_caixas is not None else list(distancias_precalculadas.keys())
+    n = len(nomes)
+    if n <= 1 or qtd_caixas <= 1:
+        return 0.0
+    n_grupos = math.ceil(n / qtd_caixas)
+    qtd_caixas = min(qtd_caixas, n)
+    matriz = _matriz_de_distancias(distancias_precalculadas, nomes)
+
+    melhor_limite = _limite_vizinho_mais_proximo(matriz, n_grupos)
+    if limite_superior is None:
+        limite_superior = _custo_guloso(matriz, qtd_caixas)
+
+    # Multiplicadores iniciais: a distância até a caixa mais próxima, o mesmo ponto de partida do limite simples
+    multiplicadores = (matriz + np.diag(np.full(n, np.inf))).min(axis=0)
+    multiplicadores[~np.isfinite(multiplicadores)] = 0.0
+    passo_relativo = 2.0
+    iteracoes_sem_melhora = 0
+
+    for _ in range(n_iter):
+        custos_reduzidos = matriz - multiplicadores[np.newaxis, :]
+        # Cada hub j fica com as (até) qtd_caixas caixas de menor custo reduzido, se negativo
+        particao = np.argpartition(custos_reduzidos, qtd_caixas - 1, axis=1)[:, :qtd_caixas]
+        escolhidos = np.take_along_axis(custos_reduzidos, particao, axis=1)
+        negativos = escolhidos < 0
+        valor_hub = np.where(negativos, escolhidos, 0.0).sum(axis=1)
+
+        hubs = np.argpartition(valor_hub, n_grupos - 1)[:n_grupos]
+        limite = float(multiplicadores.sum() + valor_hub[hubs].sum())
+        if limite > melhor_limite + 1e-9:
+            melhor_limite = limite
+            iteracoes_sem_melhora = 0
+        else:
+            iteracoes_sem_melhora += 1
+            if iteracoes_sem_melhora >= 20:
+                passo_relativo /= 2
+                iteracoes_sem_melhora = 0
+                if passo_relativo < 1e-4:
+                    break
+
+        # Subgradiente: 1 - quantas vezes cada caixa foi atribuída
+        atribuicoes = np.zeros(n)
+        np.add.at(atribuicoes, particao[hubs][negativos[hubs]], 1.0)
+        subgradiente = 1.0 - atribuicoes
+        norma = float((subgradiente ** 2).sum())
+        if norma == 0:
+            break
+        multiplicadores = multiplicadores + passo_relativo * max(limite_superior - limite, 1e-6) / norma * subgradiente
+
+    return min(melhor_limite, limite_superior)
@@ -0,0 +1,423 @@
+"""
+API importável do planejamento da rede: cada etapa do processamento (carregar KML, montar o
+grafo, inserir as caixas, calcular distâncias, otimizar, rotear e exportar) é um método que só
+executa quando é pedido e guarda o resultado para as chamadas seguintes.
+
+As bibliotecas pesadas (pyproj, shapely, networkx, simplekml) só são importadas quando a
+etapa que precisa delas roda, então importar este módulo é praticamente instantâneo.
+"""
+from __future__ import annotations
+
+import copy
+import os
+from functools import wraps
+from typing import Any, Callable, Dict, List, Optional, Tuple, TYPE_CHECKING
+
+if TYPE_CHECKING:
+    import networkx as nx
+    from avaliacao_cabo import AvaliadorComprimentoCabo
+    import simplekml
+    from pyproj import Transformer
+    from shapely.geometry import LineString, Point
+
+# Ordem das etapas: invalidar uma delas também invalida todas as seguintes
+ETAPAS = (
+    "carregar",
+    "construir_grafo",
+    "inserir_caixas",
+    "reparar_conectividade",
+    "simplificar_grafo",
+    "calcular_distancias",
+    "avaliador_cabo",
+    "otimizar",
+    "rotear",
+    "exportar",
+)
+
+# Parâmetros que só afetam a otimização em diante; podem mudar sem recalcular a rede (ver Planejador.derivar)
+PARAMETROS_DE_OTIMIZACAO = (
+    "qtd_caixas_por_grupo",
+    "parametros_ga",
+    "arquivo_estado",
+    "motor",
+    "parametros_motor",
+    "avaliacao_cabo",
+)
+
+NAMESPACE_KML_PADRAO = {"kml": "http://www.opengis.net/kml/2.2"}
+
+PARAMETROS_GA_PADRAO: Dict[str, Any] = {
+    "n_pop": 100000,
+    "n_ger": 200000,
+    "paciencia_adaptacao": 30,
+    "paciencia_parada": 60,
+    "elitismo_tamanho": 2,
+    "taxa_mutacao_inicial": 0.02,
+    "taxa_mutacao_adaptativa": 0.20,
+}
+
+
+def _etapa(metodo: Callable) -> Callable:
+    """Transforma um método sem argumentos em uma etapa preguiçosa com resultado em cache."""
+    nome_etapa = metodo.__name__
+
+    @wraps(metodo)
+    def envoltorio(self: "Planejador"):
+        if nome_etapa not in self._resultados:
+            self._resultados[nome_etapa] = metodo(self)
+        return self._resultados[nome_etapa]
+
+    return envoltorio
+
+
+class Planejador:
+    """
+    Orquestra o agrupamento das caixas de um estudo KML.
+
+    Exemplo:
+        planejador = Planejador("Estudo.kml", qtd_caixas_por_grupo=6)
+        planejador.otimizar()           # roda apenas as etapas necessárias até aqui
+        planejador.salvar_kml("saida.kml")
+    """
+
+    def __init__(
+            self,
+            arquivo_kml: str,
+            qtd_caixas_por_grupo: int = 6,
+            tolerancia_conexao_proxima: float = 2.0,
+            raio_maximo_busca: float = 5.0,
+            parametros_ga: Optional[Dict[str, Any]] = None,
+            arquivo_estado: Optional[str] = None,
+            motor: str = "genetico",
+            parametros_motor: Optional[Dict[str, Any]] = None,
+            avaliacao_cabo: Optional[str] = None,
+            distancia_maxima_ponte: Optional[float] = None,
+            contrair_grafo: bool = True,
+            namespace_kml: Optional[Dict[str, str]] = None
+    ):
+        self.arquivo_kml = arquivo_kml
+        self.qtd_caixas_por_grupo = qtd_caixas_por_grupo
+        self.tolerancia_conexao_proxima = tolerancia_conexao_proxima
+        self.raio_maximo_busca = raio_maximo_busca
+        self.parametros_ga = {**PARAMETROS_GA_PADRAO, **(parametros_ga or {})}
+        self.arquivo_estado = arquivo_estado
+        # 'parametros_ga' vale para o motor 'genetico'; 'parametros_motor' para os demais (ver solucionadores.MOTORES)
+        self.motor = motor
+        self.parametros_motor = dict(parametros_motor or {})
+        # None (aptidão em estrela), "reclassificar" (elite final pelo cabo real) ou "aptidao" (cabo real sempre)
+        if avaliacao_cabo not in (None, "reclassificar", "aptidao"):
+            raise ValueError(f"avaliacao_cabo inválida: '{avaliacao_cabo}'. Use None, 'reclassificar' ou 'aptidao'.")
+        self.avaliacao_cabo = avaliacao_cabo
+        # Maior vão (em metros) que o reparo de conectividade pode fechar; None desliga o reparo
+        self.distancia_maxima_ponte = distancia_maxima_ponte
+        # Contrai as cadeias de nós de grau 2 sem caixa antes dos cálculos de caminho mínimo
+        self.contrair_grafo = contrair_grafo
+        self.namespace_kml = namespace_kml or NAMESPACE_KML_PADRAO
+
+        self._resultados: Dict[str, Any] = {}
+        self._conversor_para_grade = None
+        self._conversor_para_mapa = None
+
+    # --- Controle do cache ---
+
+    def etapas_calculadas(self) -> List[str]:
+        """Retorna, em ordem, as etapas cujo resultado já está em cache."""
+        return [etapa for etapa in ETAPAS if etapa in self._resultados]
+
+    def invalidar(self, etapa: str = ETAPAS[0]):
+        """Descarta o resultado de 'etapa' e de todas as etapas que dependem dela."""
+        if etapa not in ETAPAS:
+            raise ValueError(f"Etapa desconhecida: '{etapa}'. Etapas válidas: {', '.join(ETAPAS)}")
+        for etapa_seguinte in ETAPAS[ETAPAS.index(etapa):]:
+            self._resultados.pop(etapa_seguinte, None)
+
+    def derivar(self, **alteracoes) -> "Planejador":
+        """
+        Cria um planejador com outros parâmetros de otimização (ver PARAMETROS_DE_OTIMIZACAO)
+        que reaproveita a rede e a matriz de distâncias já calculadas por este.
+        """
+        invalidos = set(alteracoes) - set(PARAMETROS_DE_OTIMIZACAO)
+        if invalidos:
+            raise ValueError(f"Parâmetros que exigem recalcular a rede não podem ser derivados: {', '.join(sorted(invalidos))}")
+        if alteracoes.get("avaliacao_cabo") not in (None, "reclassificar", "aptidao"):
+            raise ValueError(f"avaliacao_cabo inválida: '{alteracoes['avaliacao_cabo']}'. Use None, 'reclassificar' ou 'aptidao'.")
+
+        derivado = copy.copy(self)
+        limite = ETAPAS.index("otimizar")
+        derivado._resultados = {etapa: resultado for etapa, resultado in self._resultados.items()
+                                if ETAPAS.index(etapa) < limite}
+        for nome, valor in alteracoes.items():
+            if nome == "parametros_ga":
+                valor = {**PARAMETROS_GA_PADRAO, **(valor or {})}
+            elif nome == "parametros_motor":
+                valor = dict(valor or {})
+            setattr(derivado, nome, valor)
+        return derivado
+
+    def usar_grupos(self, grupos: List[Dict[str, Any]]):
+        """Usa 'grupos' (calculados fora deste planejador) como resultado da etapa 'otimizar'."""
+        self.invalidar("otimizar")
+        self._resultados["otimizar"] = grupos
+
+    # --- Conversores de coordenadas (pyproj só é importado aqui) ---
+
+    @property
+    def conversor_para_grade(self) -> Transformer:
+        if self._conversor_para_grade is None:
+            from pyproj import Transformer
+            self._conversor_para_grade = Transformer.from_crs("EPSG:4326", "EPSG:3857", always_xy=True)
+        return self._conversor_para_grade
+
+    @property
+    def conversor_para_mapa(self) -> Transformer:
+        if self._conversor_para_mapa is None:
+            from pyproj import Transformer
+            self._conversor_para_mapa = Transformer.from_crs("EPSG:3857", "EPSG:4326", always_xy=True)
+        return self._conversor_para_mapa
+
+    # --- Etapas ---
+
+    @_etapa
+    def carregar(self) -> Tuple[List[LineString], List[str], List[Tuple[Point, str]]]:
+        """Lê o KML e extrai as linhas elétricas e as caixas."""
+        from kml_utils import carregar_kml_raiz, extrair_geometrias_do_kml
+
+        raiz = carregar_kml_raiz(caminho_do_arquivo=self.arquivo_kml)
+        linhas_geograficas, nomes_das_linhas, caixas_com_nome = extrair_geometrias_do_kml(
+            raiz_kml=raiz,
+            namespace_kml=self.namespace_kml
+        )
+        print(f"DEBUG: {len(linhas_geograficas)} linhas elétricas encontradas. {len(caixas_com_nome)} caixas encontradas.")
+
+        if not linhas_geograficas or not caixas_com_nome:
+            raise ValueError("Erro: verifique se o KML contém pastas 'linhas_eletricas' e 'Caixas' com geometria.")
+        return linhas_geograficas, nomes_das_linhas, caixas_com_nome
+
+    @_etapa
+    def construir_grafo(self) -> Tuple[nx.Graph, List[Dict]]:
+        """Monta o grafo da rede a partir das linhas elétricas projetadas em metros."""
+        from grafo_utils import construir_rede_em_grafo
+
+        linhas_geograficas, _, _ = self.carregar()
+        return construir_rede_em_grafo(
+            linhas_geograficas=linhas_geograficas,
+            conversor_de_coordenadas=self.conversor_para_grade
+        )
+
+    @_etapa
+    def inserir_caixas(self) -> Tuple[nx.Graph, Dict[str, Tuple[float, float]]]:
+        """
+        Insere as caixas no grafo. Trabalha sobre uma cópia do grafo da etapa anterior,
+        para que mudar a tolerância e invalidar esta etapa não exija reler o KML.
+        """
+        from grafo_utils import inserir_caixas_na_rede_do_grafo
+
+        rede_base, segmentos_base = self.construir_grafo()
+        _, _, caixas_com_nome = self.carregar()
+        rede_grafo = rede_base.copy()
+        segmentos_da_rede = list(segmentos_base)
+
+        mapa_nomes_para_coordenadas = inserir_caixas_na_rede_do_grafo(
+            rede_grafo=rede_grafo,
+            segmentos_da_rede=segmentos_da_rede,
+            lista_de_caixas_com_nome=caixas_com_nome,
+            conversor_de_coordenadas=self.conversor_para_grade,
+            tolerancia_conexao_proxima=self.tolerancia_conexao_proxima,
+            raio_maximo_busca=self.raio_maximo_busca
+        )
+        return rede_grafo, mapa_nomes_para_coordenadas
+
+    @_etapa
+    def reparar_conectividade(self) -> Tuple[nx.Graph, List[Tuple]]:
+        """
+        Liga as ilhas da rede ao componente principal com pontes sintéticas de até
+        'distancia_maxima_ponte' metros. Retorna o grafo (uma cópia, se houve reparo) e as pontes.
+        """
+        from grafo_utils import reparar_conectividade_da_rede
+
+        rede_grafo, _ = self.inserir_caixas()
+        if not self.distancia_maxima_ponte:
+            return rede_grafo, []
+
+        rede_grafo = rede_grafo.copy()
+        pontes = reparar_conectividade_da_rede(rede_grafo, self.distancia_maxima_ponte)
+        if pontes:
+            maior_ponte = max(distancia for _, _, distancia in pontes)
+            print(f"🔧 Reparo de conectividade: {len(pontes)} pontes sintéticas adicionadas (maior: {maior_ponte:.2f}m).")
+        return rede_grafo, pontes
+
+    @_etapa
+    def simplificar_grafo(self) -> nx.Graph:
+        """
+        Grafo usado pelos cálculos de caminho mínimo e pelo roteamento: o grafo reparado com as
+        cadeias de nós de grau 2 sem caixa contraídas em arestas únicas (se 'contrair_grafo').
+        """
+        from grafo_utils import contrair_cadeias_de_grau_2
+
+        rede_grafo, _ = self.reparar_conectividade()
+        if not self.contrair_grafo:
+            return rede_grafo
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        rede_simplificada = rede_grafo.copy()
+        nos_antes = rede_simplificada.number_of_nodes()
+        contrair_cadeias_de_grau_2(rede_simplificada, mapa_nomes_para_coordenadas.values())
+        print(f"Grafo simplificado: {nos_antes} → {rede_simplificada.number_of_nodes()} nós, "
+              f"{rede_grafo.number_of_edges()} → {rede_simplificada.number_of_edges()} arestas.")
+        return rede_simplificada
+
+    @_etapa
+    def calcular_distancias(self) -> Dict[str, Dict[str, float]]:
+        """Pré-calcula a distância pela rede entre todas as caixas."""
+        from grafo_utils import calcular_distancias_entre_caixas
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        rede_grafo = self.simplificar_grafo()
+        print("\nPré-calculando matriz de distâncias entre todas as caixas. Aguarde...")
+        distancias_precalculadas = calcular_distancias_entre_caixas(rede_grafo, mapa_nomes_para_coordenadas)
+        print("Matriz de distâncias calculada com sucesso!")
+        return distancias_precalculadas
+
+    @_etapa
+    def avaliador_cabo(self) -> AvaliadorComprimentoCabo:
+        """Avaliador do comprimento real de cabo (união das rotas) sobre o grafo com as caixas."""
+        from avaliacao_cabo import AvaliadorComprimentoCabo
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        rede_grafo = self.simplificar_grafo()
+        return AvaliadorComprimentoCabo(rede_grafo, mapa_nomes_para_coordenadas)
+
+    @_etapa
+    def otimizar(self) -> List[Dict[str, Any]]:
+        """Roda o motor de otimização escolhido e retorna os grupos no formato [{'hub', 'grupo'}]."""
+        from solucionadores import resolver_agrupamento
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        if self.motor == "genetico":
+            parametros = {**self.parametros_ga, "arquivo_estado": self.arquivo_estado}
+            if self.avaliacao_cabo:
+                parametros["avaliador_cabo"] = self.avaliador_cabo()
+                parametros["cabo_como_aptidao"] = self.avaliacao_cabo == "aptidao"
+        else:
+            parametros = self.parametros_motor
+        return resolver_agrupamento(
+            mapa_caixa_no=mapa_nomes_para_coordenadas,
+            distancias_precalculadas=self.calcular_distancias(),
+            qtd_caixas=self.qtd_caixas_por_grupo,
+            motor=self.motor,
+            **parametros
+        )
+
+    @_etapa
+    def rotear(self) -> List[Dict]:
+        """Traça os cabos de cada grupo sem que dois grupos compartilhem um trecho."""
+        from grafo_utils import rotear_grupos_sem_sobreposicao
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        rede_grafo = self.simplificar_grafo()
+        grupos_calculados = self.otimizar()
+        if not grupos_calculados:
+            print("Algoritmo genético não retornou nenhuma solução.")
+            return []
+
+        print("\nProcessando solução final para KML com prevenção de sobreposição...")
+        return rotear_grupos_sem_sobreposicao(rede_grafo, grupos_calculados, mapa_nomes_para_coordenadas)
+
+    @_etapa
+    def exportar(self) -> simplekml.Kml:
+        """Monta o documento KML final com uma pasta por grupo."""
+        import simplekml
+        from exportador_kml import desenhar_grupo_no_mapa_kml, desenhar_pontes_sinteticas_kml
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        documento_kml_final = simplekml.Kml()
+        for i, dados_grupo_kml in enumerate(self.rotear()):
+            nome_pasta = f"Grupo {i + 1} - {len(dados_grupo_kml['grupo_final'])} caixas"
+
+            desenhar_grupo_no_mapa_kml(
+                cabo_primario=dados_grupo_kml["conexoes_principais"],
+                cabo_secundario=dados_grupo_kml["conexoes_secundarias"],
+                mapa_nomes_para_coordenadas=mapa_nomes_para_coordenadas,
+                nome_da_caixa_hub=dados_grupo_kml["nome_hub"],
+                lista_de_caixas_do_grupo=dados_grupo_kml["grupo_final"],
+                conversor_de_coordenadas_para_mapa=self.conversor_para_mapa,
+                documento_kml_existente=documento_kml_final,
+                nome_da_pasta_no_mapa=nome_pasta
+            )
+
+        _, pontes = self.reparar_conectividade()
+        desenhar_pontes_sinteticas_kml(pontes, self.conversor_para_mapa, documento_kml_final)
+        return documento_kml_final
+
+    def ajustar_parametros_ga(self, **opcoes) -> Dict[str, Any]:
+        """
+        Ajusta os parâmetros do algoritmo genético neste estudo por corrida (ver
+        ajuste_parametros.ajustar_parametros_ga) e passa a usá-los nas próximas otimizações.
+        """
+        from ajuste_parametros import ajustar_parametros_ga
+
+        _, mapa_nomes_para_coordenadas = self.inserir_caixas()
+        opcoes.setdefault("parametros_atuais", self.parametros_ga)
+        parametros_vencedores = ajustar_parametros_ga(
+            mapa_caixa_no=mapa_nomes_para_coordenadas,
+            distancias_precalculadas=self.calcular_distancias(),
+            qtd_caixas=self.qtd_caixas_por_grupo,
+            **opcoes
+        )
+        self.parametros_ga = {**self.parametros_ga, **parametros_vencedores}
+        self.invalidar("otimizar")
+        return parametros_vencedores
+
+    # --- Diagnósticos e saída ---
+
+    def verificar_conectividade(self, caminho_diagnostico: Optional[str] = "diagnostico_componentes.kml") -> bool:
+        """
+        Verifica se o grafo com as caixas (já reparado, se o reparo estiver ligado) é conexo. Se não for e 'caminho_diagnostico' for
+        informado, exporta um KML com cada componente (ilha) em uma cor.
+        """
+        import networkx as nx
+        from exportador_kml import exportar_componentes_desconectados_kml
+
+        rede_grafo, _ = self.reparar_conectividade()
+        print("\n--- Verificando a Conectividade do Grafo ---")
+        if nx.is_connected(rede_grafo):
+            print("✅ O grafo da rede está totalmente conectado.")
+            return True
+
+        num_componentes = nx.number_connected_components(rede_grafo)
+        print(f"❌ ATENÇÃO: O grafo da rede NÃO está conectado.")
+        print(f"   Ele está dividido em {num_componentes} 'ilhas' (componentes) separadas.")
+        if caminho_diagnostico:
+            exportar_componentes_desconectados_kml(
+                rede_grafo=rede_grafo,
+                conversor_de_coordenadas_para_mapa=self.conversor_para_mapa,
+                caminho_arquivo_saida=caminho_diagnostico
+            )
+        return False
+
+    def verificar_sobreposicao(self) -> bool:
+        """Retorna True se alguma aresta da rede foi usada por mais de um grupo."""
+        arestas_utilizadas_verificacao = set()
+        sobreposicoes = False
+        for grupo in self.rotear():
+            for u, v in grupo["conexoes_principais"]:
+                aresta = frozenset([u, v])
+                if aresta in arestas_utilizadas_verificacao:
+                    print(f"Sobreposição detectada na aresta {aresta}!")
+                    sobreposicoes = True
+                arestas_utilizadas_verificacao.add(aresta)
+
+        if not sobreposicoes:
+            print("Nenhuma sobreposição detectada nas rotas.")
+        return sobreposicoes
+
+    def salvar_kml(self, caminho_arquivo_saida: str):
+        """Salva o KML final, executando as etapas que ainda faltarem."""
+        self.exportar().save(caminho_arquivo_saida)
+        print(f"\nKML com rotas exclusivas salvo em: {caminho_arquivo_saida}")
+
+
+def arquivo_estado_padrao(arquivo_kml: str) -> str:
+    """Nome do arquivo de estado do algoritmo genético derivado do nome do KML."""
+    nome_base_kml = os.path.splitext(os.path.basename(arquivo_kml))[0]
+    return f"{nome_base_kml}_estado.pkl"
@@ -0,0 +1,393 @@
+"""
+Serviço local de planejamento que mantém redes preparadas (grafo e matriz de distâncias) em
+memória, para que rodadas de "e se" (outro tamanho de grupo, outro motor, outros parâmetros)
+não paguem de novo a importação das bibliotecas e a montagem da rede.
+
+API HTTP (JSON):
+    POST /redes                        {"arquivo_kml": ..., "tolerancia_conexao_proxima": ..., "raio_maximo_busca": ...,
+                                        "distancia_maxima_ponte": ..., "contrair_grafo": ...}
+    GET  /redes
+    GET  /redes/<id>
+    POST /trabalhos                    {"rede": <id>, "qtd_caixas_por_grupo": 6, "motor": "tabu", "parametros": {...}}
+    GET  /trabalhos/<id>
+    GET  /trabalhos/<id>/progresso     uma linha JSON por melhora {"iteracao", "melhor_aptidao"}, até o fim do trabalho
+    GET  /trabalhos/<id>/kml           KML do resultado, com o roteamento dos cabos
+
+Uso:
+    python servico.py [--host 127.0.0.1] [--porta 8765] [--socket /caminho/do/socket]
+"""
+import argparse
+import asyncio
+import json
+import multiprocessing
+import os
+import re
+import threading
+from concurrent.futures import ProcessPoolExecutor
+from functools import partial
+from typing import Any, Dict, List, Optional, Tuple
+
+from planejador import PARAMETROS_GA_PADRAO, Planejador
+
+# Parâmetros de Planejador que definem uma rede; duas requisições iguais compartilham a mesma rede preparada
+PARAMETROS_DA_REDE = (
+    "arquivo_kml",
+    "tolerancia_conexao_proxima",
+    "raio_maximo_busca",
+    "distancia_maxima_ponte",
+    "contrair_grafo",
+)
+
+_ROTAS = [
+    ("POST", re.compile(r"^/redes/?$"), "_criar_rede"),
+    ("GET", re.compile(r"^/redes/?$"), "_listar_redes"),
+    ("GET", re.compile(r"^/redes/(?P<id_rede>[\w-]+)/?$"), "_consultar_rede"),
+    ("POST", re.compile(r"^/trabalhos/?$"), "_criar_trabalho"),
+    ("GET", re.compile(r"^/trabalhos/(?P<id_trabalho>[\w-]+)/?$"), "_consultar_trabalho"),
+    ("GET", re.compile(r"^/trabalhos/(?P<id_trabalho>[\w-]+)/progresso/?$"), "_transmitir_progresso"),
+    ("GET", re.compile(r"^/trabalhos/(?P<id_trabalho>[\w-]+)/kml/?$"), "_baixar_kml"),
+]
+
+_MOTIVOS_HTTP = {200: "OK", 202: "Accepted", 400: "Bad Request", 404: "Not Found", 409: "Conflict",
+                 500: "Internal Server Error"}
+
+
+class ErroHTTP(Exception):
+    def __init__(self, status: int, mensagem: str):
+        super().__init__(mensagem)
+        self.status = status
+
+
+def _publicar_progresso(fila_progresso, id_trabalho: str, iteracao: int, melhor_aptidao: float):
+    fila_progresso.put((id_trabalho, iteracao, melhor_aptidao))
+
+
+def _executar_trabalho(
+        id_trabalho: str,
+        fila_progresso,
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        motor: str,
+        parametros: Dict[str, Any]
+) -> Tuple[List[Dict[str, Any]], float]:
+    """Roda em um processo do pool: otimiza e devolve (grupos, custo)."""
+    from solucionadores import custo_dos_grupos, resolver_agrupamento
+
+    ao_progredir = partial(_publicar_progresso, fila_progresso, id_trabalho)
+    grupos = resolver_agrupamento(mapa_caixa_no, distancias_precalculadas, qtd_caixas, motor=motor,
+                                  ao_progredir=ao_progredir, **parametros)
+    return grupos, custo_dos_grupos(grupos, distancias_precalculadas)
+
+
+class ServicoPlanejamento:
+    """Guarda as redes preparadas e os trabalhos, e atende as conexões HTTP."""
+
+    def __init__(self, processos: Optional[int] = None):
+        self.redes: Dict[str, Dict[str, Any]] = {}
+        self.trabalhos: Dict[str, Dict[str, Any]] = {}
+        self._planejadores: Dict[str, Planejador] = {}
+        self._preparos: Dict[str, asyncio.Future] = {}
+        self._condicoes: Dict[str, asyncio.Condition] = {}
+        self._processos = processos
+        self._trabalhos_despachados = 0
+        self._executor: Optional[ProcessPoolExecutor] = None
+        self._gerenciador = None
+        self._fila_progresso = None
+        self._leitor_progresso: Optional[threading.Thread] = None
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+
+    # --- Ciclo de vida ---
+
+    def iniciar(self):
+        self._loop = asyncio.get_running_loop()
+        self._processos = self._processos or os.cpu_count() or 1
+        self._executor = ProcessPoolExecutor(max_workers=self._processos)
+        self._gerenciador = multiprocessing.Manager()
+        self._fila_progresso = self._gerenciador.Queue()
+        self._leitor_progresso = threading.Thread(target=self._ler_progresso, daemon=True)
+        self._leitor_progresso.start()
+
+    def encerrar(self):
+        if self._fila_progresso is not None:
+            self._fila_progresso.put(None)
+        if self._executor is not None:
+            self._executor.shutdown(cancel_futures=True)
+        if self._gerenciador is not None:
+            self._gerenciador.shutdown()
+
+    def _ler_progresso(self):
+        """Thread que repassa ao loop do asyncio o progresso publicado pelos processos do pool."""
+        while True:
+            try:
+                mensagem = self._fila_progresso.get()
+            except (EOFError, OSError):
+                return
+            if mensagem is None:
+                return
+            self._loop.call_soon_threadsafe(self._registrar_progresso, *mensagem)
+
+    def _registrar_progresso(self, id_trabalho: str, iteracao: int, melhor_aptidao: float):
+        trabalho = self.trabalhos.get(id_trabalho)
+        if trabalho is None:
+            return
+        trabalho["progresso"].append({"iteracao": iteracao, "melhor_aptidao": melhor_aptidao})
+        self._loop.create_task(self._notificar(id_trabalho))
+
+    async def _notificar(self, id_trabalho: str):
+        condicao = self._condicoes[id_trabalho]
+        async with condicao:
+            condicao.notify_all()
+
+    # --- Redes ---
+
+    async def _criar_rede(self, corpo: Dict[str, Any]):
+        if "arquivo_kml" not in corpo:
+            raise ErroHTTP(400, "Informe 'arquivo_kml'.")
+        desconhecidos = set(corpo) - set(PARAMETROS_DA_REDE)
+        if desconhecidos:
+            raise ErroHTTP(400, f"Parâmetros de rede desconhecidos: {', '.join(sorted(desconhecidos))}")
+
+        configuracao = {nome: corpo[nome] for nome in PARAMETROS_DA_REDE if nome in corpo}
+        configuracao["arquivo_kml"] = os.path.abspath(configuracao["arquivo_kml"])
+        for id_rede, rede in self.redes.items():
+            if rede["configuracao"] == configuracao:
+                return 200, rede
+
+        id_rede = f"rede-{len(self.redes) + 1}"
+        planejador = Planejador(**configuracao)
+        rede = {"id": id_rede, "configuracao": configuracao, "estado": "preparando", "erro": None}
+        self.redes[id_rede] = rede
+        self._planejadores[id_rede] = planejador
+        self._preparos[id_rede] = self._loop.create_task(self._preparar_rede(id_rede, planejador))
+        return 202, rede
+
+    async def _preparar_rede(self, id_rede: str, planejador: Planejador):
+        rede = self.redes[id_rede]
+        try:
+            # Monta grafo e matriz de distâncias fora do loop, para o serviço seguir respondendo
+            await self._loop.run_in_executor(None, planejador.calcular_distancias)
+            _, mapa_nomes_para_coordenadas = planejador.inserir_caixas()
+            rede.update(estado="pronta", qtd_caixas=len(mapa_nomes_para_coordenadas))
+        except Exception as e:
+            rede.update(estado="erro", erro=str(e))
+
+    async def _listar_redes(self, corpo):
+        return 200, list(self.redes.values())
+
+    async def _consultar_rede(self, corpo, id_rede: str):
+        if id_rede not in self.redes:
+            raise ErroHTTP(404, f"Rede '{id_rede}' não encontrada.")
+        return 200, self.redes[id_rede]
+
+    # --- Trabalhos ---
+
+    async def _criar_trabalho(self, corpo: Dict[str, Any]):
+        id_rede = corpo.get("rede")
+        if id_rede not in self.redes:
+            raise ErroHTTP(404, f"Rede '{id_rede}' não encontrada.")
+        motor = corpo.get("motor", "genetico")
+        parametros = dict(corpo.get("parametros", {}))
+        if motor == "genetico":
+            parametros = {**PARAMETROS_GA_PADRAO, **parametros}
+
+        id_trabalho = f"trabalho-{len(self.trabalhos) + 1}"
+        trabalho = {
+            "id": id_trabalho,
+            "rede": id_rede,
+            "qtd_caixas_por_grupo": int(corpo.get("qtd_caixas_por_grupo", 6)),
+            "motor": motor,
+            "parametros": parametros,
+            "estado": "na_fila",
+            "progresso": [],
+            "custo": None,
+            "grupos": None,
+            "erro": None,
+        }
+        self.trabalhos[id_trabalho] = trabalho
+        self._condicoes[id_trabalho] = asyncio.Condition()
+        self._loop.create_task(self._executar(id_trabalho))
+        return 202, self._resumo(trabalho)
+
+    async def _executar(self, id_trabalho: str):
+        trabalho = self.trabalhos[id_trabalho]
+        despachado = False
+        try:
+            await self._preparos[trabalho["rede"]]
+            rede = self.redes[trabalho["rede"]]
+            if rede["estado"] != "pronta":
+                raise RuntimeError(f"A rede '{rede['id']}' não pôde ser preparada: {rede['erro']}")
+
+            planejador = self._planejadores[trabalho["rede"]]
+            _, mapa_nomes_para_coordenadas = planejador.inserir_caixas()
+            distancias = planejador.calcular_distancias()
+
+            # Cada trabalho já ocupa um processo do pool; o Pool interno do motor fica com a sua fatia dos núcleos,
+            # contada no despacho pelos trabalhos que estão de fato rodando: um trabalho sozinho usa todos os núcleos,
+            # e trabalhos simultâneos não abrem processos ao quadrado do número de núcleos
+            self._trabalhos_despachados += 1
+            despachado = True
+            em_execucao = min(self._trabalhos_despachados, self._processos)
+            processos_por_trabalho = max(1, (os.cpu_count() or 1) // em_execucao)
+            pedido = trabalho["parametros"].get("processos")
+            trabalho["parametros"]["processos"] = min(pedido or processos_por_trabalho, processos_por_trabalho)
+
+            trabalho["estado"] = "executando"
+            grupos, custo = await self._loop.run_in_executor(
+                self._executor,
+                partial(_executar_trabalho, id_trabalho, self._fila_progresso, mapa_nomes_para_coordenadas,
+                        distancias, trabalho["qtd_caixas_por_grupo"], trabalho["motor"], trabalho["parametros"])
+            )
+            trabalho.update(estado="concluido", grupos=grupos, custo=custo)
+        except Exception as e:
+            trabalho.update(estado="erro", erro=str(e))
+        finally:
+            if despachado:
+                self._trabalhos_despachados -= 1
+        await self._notificar(id_trabalho)
+
+    def _obter_trabalho(self, id_trabalho: str) -> Dict[str, Any]:
+        if id_trabalho not in self.trabalhos:
+            raise ErroHTTP(404, f"Trabalho '{id_trabalho}' não encontrado.")
+        return self.trabalhos[id_trabalho]
+
+    @staticmethod
+    def _resumo(trabalho: Dict[str, Any]) -> Dict[str, Any]:
+        resumo = {chave: valor for chave, valor in trabalho.items() if chave not in ("progresso", "kml")}
+        resumo["ultimo_progresso"] = trabalho["progresso"][-1] if trabalho["progresso"] else None
+        return resumo
+
+    async def _consultar_trabalho(self, corpo, id_trabalho: str):
+        return 200, self._resumo(self._obter_trabalho(id_trabalho))
+
+    async def _transmitir_progresso(self, corpo, id_trabalho: str, escritor: asyncio.StreamWriter):
+        trabalho = self._obter_trabalho(id_trabalho)
+        condicao = self._condicoes[id_trabalho]
+        escritor.write(b"HTTP/1.1 200 OK\r\nContent-Type: application/x-ndjson\r\n"
+                       b"Transfer-Encoding: chunked\r\nConnection: close\r\n\r\n")
+
+        enviados = 0
+        while True:
+            async with condicao:
+                await condicao.wait_for(lambda: len(trabalho["progresso"]) > enviados
+                                        or trabalho["estado"] in ("concluido", "erro"))
+            for registro in trabalho["progresso"][enviados:]:
+                _escrever_pedaco(escritor, json.dumps(registro) + "\n")
+            enviados = len(trabalho["progresso"])
+            await escritor.drain()
+            if trabalho["estado"] in ("concluido", "erro"):
+                break
+
+        final = {"estado": trabalho["estado"], "custo": trabalho["custo"], "erro": trabalho["erro"]}
+        _escrever_pedaco(escritor, json.dumps(final) + "\n")
+        escritor.write(b"0\r\n\r\n")
+        await escritor.drain()
+        return None
+
+    async def _baixar_kml(self, corpo, id_trabalho: str):
+        trabalho = self._obter_trabalho(id_trabalho)
+        if trabalho["estado"] != "concluido":
+            raise ErroHTTP(409, f"O trabalho '{id_trabalho}' ainda não foi concluído (estado: {trabalho['estado']}).")
+
+        if "kml" not in trabalho:
+            planejador = self._planejadores[trabalho["rede"]].derivar(
+                qtd_caixas_por_grupo=trabalho["qtd_caixas_por_grupo"])
+            planejador.usar_grupos(trabalho["grupos"])
+            documento = await self._loop.run_in_executor(None, planejador.exportar)
+            trabalho["kml"] = documento.kml()
+        return 200, trabalho["kml"]
+
+    # --- HTTP ---
+
+    async def atender(self, leitor: asyncio.StreamReader, escritor: asyncio.StreamWriter):
+        try:
+            linha_inicial = await leitor.readline()
+            if not linha_inicial:
+                return
+            metodo, alvo, _ = linha_inicial.decode("latin-1").split(" ", 2)
+            cabecalhos = {}
+            while True:
+                linha = await leitor.readline()
+                if linha in (b"\r\n", b"\n", b""):
+                    break
+                nome, _, valor = linha.decode("latin-1").partition(":")
+                cabecalhos[nome.strip().lower()] = valor.strip()
+            dados = await leitor.readexactly(int(cabecalhos.get("content-length", 0)))
+
+            try:
+                corpo = json.loads(dados) if dados else {}
+                resposta = await self._despachar(metodo, alvo.split("?", 1)[0], corpo, escritor)
+            except ErroHTTP as e:
+                resposta = (e.status, {"erro": str(e)})
+            except (ValueError, TypeError) as e:
+                resposta = (400, {"erro": str(e)})
+            except Exception as e:
+                resposta = (500, {"erro": str(e)})
+
+            if resposta is not None:
+                _escrever_resposta(escritor, *resposta)
+                await escritor.drain()
+        except (ConnectionError, asyncio.IncompleteReadError):
+            pass
+        finally:
+            escritor.close()
+
+    async def _despachar(self, metodo: str, caminho: str, corpo: Dict[str, Any], escritor):
+        for metodo_rota, padrao, nome_manipulador in _ROTAS:
+            correspondencia = padrao.match(caminho)
+            if correspondencia and metodo == metodo_rota:
+                manipulador = getattr(self, nome_manipulador)
+                argumentos = correspondencia.groupdict()
+                if nome_manipulador == "_transmitir_progresso":
+                    argumentos["escritor"] = escritor
+                return await manipulador(corpo, **argumentos)
+        raise ErroHTTP(404, f"Rota não encontrada: {metodo} {caminho}")
+
+
+def _escrever_pedaco(escritor: asyncio.StreamWriter, texto: str):
+    dados = texto.encode("utf-8")
+    escritor.write(f"{len(dados):X}\r\n".encode("ascii") + dados + b"\r\n")
+
+
+def _escrever_resposta(escritor: asyncio.StreamWriter, status: int, conteudo: Any):
+    if isinstance(conteudo, str):
+        dados = conteudo.encode("utf-8")
+        tipo = "application/vnd.google-earth.kml+xml"
+    else:
+        dados = json.dumps(conteudo, ensure_ascii=False, default=str).encode("utf-8")
+        tipo = "application/json; charset=utf-8"
+    cabecalho = (f"HTTP/1.1 {status} {_MOTIVOS_HTTP.get(status, '')}\r\nContent-Type: {tipo}\r\n"
+                 f"Content-Length: {len(dados)}\r\nConnection: close\r\n\r\n")
+    escritor.write(cabecalho.encode("latin-1") + dados)
+
+
+async def executar_servico(host: str = "127.0.0.1", porta: int = 8765, caminho_socket: Optional[str] = None,
+                           processos: Optional[int] = None):
+    servico = ServicoPlanejamento(processos=processos)
+    servico.iniciar()
+    try:
+        if caminho_socket:
+            servidor = await asyncio.start_unix_server(servico.atender, path=caminho_socket)
+            print(f"Serviço de planejamento ouvindo em unix:{caminho_socket}")
+        else:
+            servidor = await asyncio.start_server(servico.atender, host=host, port=porta)
+            print(f"Serviço de planejamento ouvindo em http://{host}:{porta}")
+        async with servidor:
+            await servidor.serve_forever()
+    finally:
+        servico.encerrar()
+
+
+if __name__ == "__main__":
+    analisador = argparse.ArgumentParser(description="Serviço local de planejamento com redes mantidas em memória.")
+    analisador.add_argument("--host", default="127.0.0.1")
+    analisador.add_argument("--porta", type=int, default=8765)
+    analisador.add_argument("--socket", dest="caminho_socket", default=None,
+                            help="Caminho de um socket Unix (substitui host e porta).")
+    analisador.add_argument("--processos", type=int, default=None,
+                            help="Processos do pool de otimização (padrão: um por núcleo).")
+    argumentos = analisador.parse_args()
+    try:
+        asyncio.run(executar_servico(argumentos.host, argumentos.porta, argumentos.caminho_socket, argumentos.processos))
+    except KeyboardInterrupt:
+        print("\nServiço encerrado.")
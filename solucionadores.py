@@ -0,0 +1,374 @@
+"""
+Motores de otimização intercambiáveis para o agrupamento das caixas.
+
+Todos recebem as mesmas entradas do 'algoritmo_genetico' (mapa_caixa_no, tabela de distâncias,
+qtd_caixas) e retornam a mesma saída: uma lista [{"hub": nome, "grupo": [hub, membro, ...]}].
+Além do algoritmo genético, há dois motores de solução única — recozimento simulado e busca
+tabu — que avaliam trocas e realocações de caixas entre grupos em O(1).
+"""
+import heapq
+import math
+import os
+import random
+from functools import partial
+from multiprocessing import Pool
+from typing import List, Dict, Any, Tuple, Optional, Callable
+
+# Mesma penalidade usada pelo algoritmo genético para pares de caixas sem caminho na rede
+DISTANCIA_SEM_CAMINHO = 1e9
+
+
+def custo_dos_grupos(grupos: List[Dict[str, Any]], distancias: Dict[str, Dict[str, float]]) -> float:
+    """Soma das distâncias hub→membro de todos os grupos (a mesma aptidão do algoritmo genético)."""
+    custo_total = 0.0
+    for grupo in grupos:
+        distancias_do_hub = distancias.get(grupo["hub"], {})
+        for nome_caixa in grupo["grupo"]:
+            if nome_caixa != grupo["hub"]:
+                custo_total += distancias_do_hub.get(nome_caixa, DISTANCIA_SEM_CAMINHO)
+    return custo_total
+
+
+class _EstadoAgrupamento:
+    """
+    Solução corrente de um motor de solução única, com as caixas representadas por índices.
+
+    Cada grupo guarda o hub na posição 0. O custo de cada grupo é mantido atualizado para que
+    trocas e realocações sejam avaliadas e aplicadas sem recalcular a solução inteira.
+    """
+
+    def __init__(self, nomes: List[str], distancias: Dict[str, Dict[str, float]], qtd_caixas: int,
+                 rng: random.Random):
+        self.nomes = nomes
+        self.qtd_caixas = qtd_caixas
+        self.rng = rng
+        n = len(nomes)
+
+        # Matriz densa (lista de listas) para acesso O(1) sem hashing de strings
+        self.d: List[List[float]] = []
+        for nome_origem in nomes:
+            linha = distancias.get(nome_origem, {})
+            self.d.append([linha.get(nome_destino, DISTANCIA_SEM_CAMINHO) for nome_destino in nomes])
+
+        # Solução inicial aleatória com a mesma divisão em blocos do algoritmo genético
+        ordem = list(range(n))
+        rng.shuffle(ordem)
+        self.membros: List[List[int]] = [ordem[i:i + qtd_caixas] for i in range(0, n, qtd_caixas)]
+        self.grupo_de = [0] * n
+        self.posicao = [0] * n
+        for g, membros in enumerate(self.membros):
+            for p, caixa in enumerate(membros):
+                self.grupo_de[caixa] = g
+                self.posicao[caixa] = p
+        self.custo_grupo = [self._custo_do_grupo(membros[0], membros) for membros in self.membros]
+        self.custo = sum(self.custo_grupo)
+
+    def _custo_do_grupo(self, hub: int, membros: List[int]) -> float:
+        linha_hub = self.d[hub]
+        return sum(linha_hub[caixa] for caixa in membros if caixa != hub)
+
+    # --- Movimentos ---
+
+    def sortear_movimento(self) -> Optional[Tuple]:
+        """
+        Sorteia um movimento e retorna (tipo, argumentos..., delta) ou None se o sorteio
+        não produziu um movimento válido. Tipos: 'trocar', 'realocar' e 'hub'.
+        """
+        rng = self.rng
+        n_grupos = len(self.membros)
+        if n_grupos > 1 and rng.random() >= 0.1:
+            x = rng.randrange(len(self.nomes))
+            y = rng.randrange(len(self.nomes))
+            gx, gy = self.grupo_de[x], self.grupo_de[y]
+            if gx == gy or self.posicao[x] == 0:
+                return None
+            if len(self.membros[gy]) < self.qtd_caixas and (self.posicao[y] == 0 or rng.random() < 0.5):
+                return ("realocar", x, gy, self.delta_realocar(x, gy))
+            if self.posicao[y] == 0:
+                return None
+            return ("trocar", x, y, self.delta_trocar(x, y))
+
+        g = rng.randrange(n_grupos)
+        if len(self.membros[g]) < 2:
+            return None
+        novo_hub = self.membros[g][rng.randrange(1, len(self.membros[g]))]
+        return ("hub", g, novo_hub, self.delta_hub(g, novo_hub))
+
+    def delta_trocar(self, x: int, y: int) -> float:
+        """Troca dois membros (não hubs) de grupos diferentes. O(1)."""
+        hub_x = self.membros[self.grupo_de[x]][0]
+        hub_y = self.membros[self.grupo_de[y]][0]
+        d = self.d
+        return d[hub_x][y] + d[hub_y][x] - d[hub_x][x] - d[hub_y][y]
+
+    def delta_realocar(self, x: int, g_destino: int) -> float:
+        """Move um membro (não hub) para um grupo com vaga. O(1)."""
+        return self.d[self.membros[g_destino][0]][x] - self.d[self.membros[self.grupo_de[x]][0]][x]
+
+    def delta_hub(self, g: int, novo_hub: int) -> float:
+        """Promove outro membro a hub do grupo. O(tamanho do grupo)."""
+        return self._custo_do_grupo(novo_hub, self.membros[g]) - self.custo_grupo[g]
+
+    def aplicar(self, movimento: Tuple):
+        tipo, a, b, delta = movimento
+        if tipo == "trocar":
+            gx, gy = self.grupo_de[a], self.grupo_de[b]
+            px, py = self.posicao[a], self.posicao[b]
+            self.membros[gx][px], self.membros[gy][py] = b, a
+            self.grupo_de[a], self.grupo_de[b] = gy, gx
+            self.posicao[a], self.posicao[b] = py, px
+            self.custo_grupo[gx] += self.d[self.membros[gx][0]][b] - self.d[self.membros[gx][0]][a]
+            self.custo_grupo[gy] += self.d[self.membros[gy][0]][a] - self.d[self.membros[gy][0]][b]
+        elif tipo == "realocar":
+            g_origem = self.grupo_de[a]
+            origem = self.membros[g_origem]
+            ultimo = origem[-1]
+            origem[self.posicao[a]] = ultimo
+            self.posicao[ultimo] = self.posicao[a]
+            origem.pop()
+            self.custo_grupo[g_origem] -= self.d[origem[0]][a]
+            self.membros[b].append(a)
+            self.grupo_de[a] = b
+            self.posicao[a] = len(self.membros[b]) - 1
+            self.custo_grupo[b] += self.d[self.membros[b][0]][a]
+        else:
+            membros = self.membros[a]
+            p_novo = self.posicao[b]
+            antigo_hub = membros[0]
+            membros[0], membros[p_novo] = b, antigo_hub
+            self.posicao[b], self.posicao[antigo_hub] = 0, p_novo
+            self.custo_grupo[a] += delta
+        self.custo += delta
+
+    # --- Conversão ---
+
+    def copiar_grupos(self) -> List[List[int]]:
+        return [list(membros) for membros in self.membros]
+
+    def decodificar(self, membros_por_grupo: List[List[int]]) -> List[Dict[str, Any]]:
+        grupos_finais = []
+        for membros in membros_por_grupo:
+            nomes_grupo = [self.nomes[caixa] for caixa in membros]
+            grupos_finais.append({"hub": nomes_grupo[0], "grupo": nomes_grupo})
+        return grupos_finais
+
+
+def recozimento_simulado(
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        n_iter: Optional[int] = None,
+        temperatura_inicial: Optional[float] = None,
+        temperatura_final: Optional[float] = None,
+        semente: Optional[int] = None,
+        ao_progredir: Optional[Callable[[int, float], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Recozimento simulado com resfriamento geométrico de 'temperatura_inicial' até 'temperatura_final'.
+
+    Se 'temperatura_inicial' não for informada, é calibrada pela escala local da rede: uma piora
+    do tamanho da distância mediana de uma caixa até a sua (qtd_caixas - 1)-ésima vizinha é aceita
+    com 50% de probabilidade. (Calibrar pelas pioras da solução inicial aleatória deixaria a busca
+    quase aleatória na maior parte do resfriamento.) A final padrão é mil vezes menor e 'n_iter'
+    padrão é 3000 iterações por caixa. 'ao_progredir(iteracao, melhor_aptidao)' é chamado a cada
+    décimo das iterações.
+    """
+    print("\n--- Iniciando Recozimento Simulado ---")
+    rng = random.Random(semente)
+    estado = _EstadoAgrupamento(list(mapa_caixa_no.keys()), distancias_precalculadas, qtd_caixas, rng)
+    if n_iter is None:
+        n_iter = 3000 * len(estado.nomes)
+
+    if temperatura_inicial is None:
+        # A linha inclui a própria caixa (distância 0), então a qtd_caixas-ésima menor é a (qtd_caixas - 1)-ésima vizinha
+        distancias_vizinhas = sorted(
+            vizinha for vizinha in (heapq.nsmallest(min(qtd_caixas, len(linha)), linha)[-1] for linha in estado.d)
+            if 0 < vizinha < DISTANCIA_SEM_CAMINHO
+        )
+        distancia_tipica = distancias_vizinhas[len(distancias_vizinhas) // 2] if distancias_vizinhas else 1.0
+        temperatura_inicial = distancia_tipica / math.log(2)
+    if temperatura_final is None:
+        temperatura_final = temperatura_inicial * 1e-3
+    fator_resfriamento = (temperatura_final / temperatura_inicial) ** (1.0 / max(n_iter, 1))
+
+    melhor_custo = estado.custo
+    melhor_grupos = estado.copiar_grupos()
+    temperatura = temperatura_inicial
+    intervalo_log = max(n_iter // 10, 1)
+
+    for it in range(n_iter):
+        movimento = estado.sortear_movimento()
+        if movimento is not None:
+            delta = movimento[-1]
+            if delta <= 0 or rng.random() < math.exp(-delta / temperatura):
+                estado.aplicar(movimento)
+                if estado.custo < melhor_custo - 1e-9:
+                    melhor_custo = estado.custo
+                    melhor_grupos = estado.copiar_grupos()
+        temperatura *= fator_resfriamento
+        if (it + 1) % intervalo_log == 0:
+            print(f"Iteração {it + 1}/{n_iter} | T={temperatura:.2f} | Melhor Aptidão: {melhor_custo:.2f}m")
+            if ao_progredir is not None:
+                ao_progredir(it + 1, melhor_custo)
+
+    print("--- Recozimento Simulado Finalizado ---")
+    return estado.decodificar(melhor_grupos)
+
+
+def busca_tabu(
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        n_iter: int = 5000,
+        tamanho_vizinhanca: int = 300,
+        permanencia_tabu: int = 15,
+        paciencia_parada: int = 1000,
+        semente: Optional[int] = None,
+        ao_progredir: Optional[Callable[[int, float], None]] = None
+) -> List[Dict[str, Any]]:
+    """
+    Busca tabu sobre uma amostra de 'tamanho_vizinhanca' movimentos por iteração.
+
+    Depois que uma caixa sai de um grupo, voltar para ele fica proibido por 'permanencia_tabu'
+    iterações, a menos que o movimento gere uma nova melhor solução (critério de aspiração).
+    'ao_progredir(iteracao, melhor_aptidao)' é chamado a cada nova melhor solução.
+    """
+    print("\n--- Iniciando Busca Tabu ---")
+    rng = random.Random(semente)
+    estado = _EstadoAgrupamento(list(mapa_caixa_no.keys()), distancias_precalculadas, qtd_caixas, rng)
+
+    melhor_custo = estado.custo
+    melhor_grupos = estado.copiar_grupos()
+    tabu_ate: Dict[Tuple, int] = {}
+    iteracoes_sem_melhora = 0
+
+    def atributos(movimento: Tuple) -> List[Tuple]:
+        tipo, a, b, _ = movimento
+        if tipo == "trocar":
+            return [(a, estado.grupo_de[b]), (b, estado.grupo_de[a])]
+        if tipo == "realocar":
+            return [(a, b)]
+        return [("hub", a, b)]
+
+    for it in range(n_iter):
+        melhor_movimento = None
+        for _ in range(tamanho_vizinhanca):
+            movimento = estado.sortear_movimento()
+            if movimento is None or (melhor_movimento is not None and movimento[-1] >= melhor_movimento[-1]):
+                continue
+            proibido = any(tabu_ate.get(atributo, -1) >= it for atributo in atributos(movimento))
+            if proibido and estado.custo + movimento[-1] >= melhor_custo - 1e-9:
+                continue
+            melhor_movimento = movimento
+
+        if melhor_movimento is None:
+            continue
+
+        # Proíbe desfazer o movimento: a caixa não volta ao grupo de onde saiu, o hub antigo não volta a ser hub
+        tipo, a, b, _ = melhor_movimento
+        if tipo == "trocar":
+            reversos = [(a, estado.grupo_de[a]), (b, estado.grupo_de[b])]
+        elif tipo == "realocar":
+            reversos = [(a, estado.grupo_de[a])]
+        else:
+            reversos = [("hub", a, estado.membros[a][0])]
+        estado.aplicar(melhor_movimento)
+        for atributo in reversos:
+            tabu_ate[atributo] = it + permanencia_tabu + rng.randrange(permanencia_tabu // 2 + 1)
+
+        if estado.custo < melhor_custo - 1e-9:
+            melhor_custo = estado.custo
+            melhor_grupos = estado.copiar_grupos()
+            iteracoes_sem_melhora = 0
+            print(f"Iteração {it + 1}/{n_iter} | 🏆 Nova Melhor Aptidão: {melhor_custo:.2f}m")
+            if ao_progredir is not None:
+                ao_progredir(it + 1, melhor_custo)
+        else:
+            iteracoes_sem_melhora += 1
+            if iteracoes_sem_melhora >= paciencia_parada:
+                print(f"\n⏹️ Parada Antecipada na iteração {it + 1}. A solução não melhora há {paciencia_parada} iterações.")
+                break
+
+    print("--- Busca Tabu Finalizada ---")
+    return estado.decodificar(melhor_grupos)
+
+
+def _algoritmo_genetico(*args, **kwargs) -> List[Dict[str, Any]]:
+    # Importado sob demanda para manter o carregamento deste módulo leve
+    from algoritmo_genetico import algoritmo_genetico
+    return algoritmo_genetico(*args, **kwargs)
+
+
+MOTORES: Dict[str, Callable[..., List[Dict[str, Any]]]] = {
+    "genetico": _algoritmo_genetico,
+    "recozimento": recozimento_simulado,
+    "tabu": busca_tabu,
+}
+
+# Motores que já paralelizam internamente e por isso não podem rodar dentro de outro Pool
+_MOTORES_COM_POOL_PROPRIO = {"genetico"}
+
+
+def _executar_inicio(
+        semente: int,
+        motor: str,
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        parametros: Dict[str, Any]
+) -> Tuple[float, List[Dict[str, Any]]]:
+    grupos = MOTORES[motor](mapa_caixa_no, distancias_precalculadas, qtd_caixas, semente=semente, **parametros)
+    return custo_dos_grupos(grupos, distancias_precalculadas), grupos
+
+
+def resolver_agrupamento(
+        mapa_caixa_no: Dict[str, Tuple],
+        distancias_precalculadas: Dict[str, Dict[str, float]],
+        qtd_caixas: int,
+        motor: str = "genetico",
+        n_inicios: int = 1,
+        semente: Optional[int] = None,
+        processos: Optional[int] = None,
+        **parametros
+) -> List[Dict[str, Any]]:
+    """
+    Ponto de entrada comum a todos os motores de otimização.
+
+    Args:
+        motor: Um dos nomes em MOTORES ('genetico', 'recozimento' ou 'tabu').
+        n_inicios: Para os motores de solução única, quantas execuções independentes rodar em
+            paralelo (uma por núcleo); 0 usa todos os núcleos. O melhor resultado é retornado.
+        semente: Semente da primeira execução; as demais usam sementes consecutivas.
+        processos: Limite de processos (o Pool do algoritmo genético ou o dos inícios paralelos);
+            o padrão é um por núcleo.
+        **parametros: Parâmetros específicos do motor escolhido (ex.: n_pop, n_iter).
+    """
+    if motor not in MOTORES:
+        raise ValueError(f"Motor desconhecido: '{motor}'. Motores disponíveis: {', '.join(MOTORES)}")
+
+    if motor in _MOTORES_COM_POOL_PROPRIO:
+        if n_inicios > 1:
+            print(f"⚠️ Aviso: O motor '{motor}' já usa todos os núcleos; 'n_inicios' será ignorado.")
+        return MOTORES[motor](mapa_caixa_no, distancias_precalculadas, qtd_caixas, processos=processos,
+                              semente=semente, **parametros)
+
+    if n_inicios <= 0:
+        n_inicios = os.cpu_count() or 1
+    semente_base = semente if semente is not None else random.randrange(2 ** 31)
+    sementes = [semente_base + i for i in range(n_inicios)]
+    executor = partial(_executar_inicio, motor=motor, mapa_caixa_no=mapa_caixa_no,
+                       distancias_precalculadas=distancias_precalculadas, qtd_caixas=qtd_caixas,
+                       parametros=parametros)
+
+    processos = min(n_inicios, processos or os.cpu_count() or 1)
+    if n_inicios == 1 or processos == 1:
+        resultados = [executor(semente_inicio) for semente_inicio in sementes]
+    else:
+        print(f"Executando {n_inicios} inícios independentes do motor '{motor}' em {processos} processos...")
+        with Pool(processos) as pool:
+            resultados = pool.map(executor, sementes)
+
+    melhor_custo, melhores_grupos = min(resultados, key=lambda resultado: resultado[0])
+    if n_inicios > 1:
+        print(f"Melhor entre {n_inicios} inícios: {melhor_custo:.2f}m")
+    return melhores_grupos